@@ -1,48 +1,51 @@
 import pandas as pd
 import streamlit as st
 from streamlit_option_menu import option_menu
-import plotly.express as px
-import numpy as np
 
+from dimensao import LABELS
+from graficos import reduzir_painel
+from medicao import executou, iniciar, mostrar, secao
+from paineis import (painel_convenios, painel_exames, painel_faixa_idade,
+                     painel_sexo, painel_visao_geral)
+from pacientes import (avisos_pacientes, invalidar_pacientes, obter_exames, obter_fonte,
+                       versao_pacientes)
 
-def carregar_dados():
-    df = pd.read_excel('paciente_por_data.xlsx')
-    df['Valor R$'] = [f'{v}'.replace(',', '.').replace(
-        '.', '').replace('R$\xa0', '') for v in df['Valor R$']]
-    df['Valor R$'] = df['Valor R$'].astype('float')/100
+pd.options.mode.copy_on_write = True
 
-    df['Valor Final'] = [f'{v}'.replace(',', '.').replace(
-        '.', '').replace('R$\xa0', '') for v in df['Valor Final']]
-    df['Valor Final'] = df['Valor Final'].astype('float')/100
-
-    df['Data Nasc.'] = pd.to_datetime(df['Data Nasc.'], errors='coerce')
-    df['Data Cad.'] = pd.to_datetime(df['Data Cad.'], errors='coerce')
-
-    df['Idade'] = (
-        ((df['Data Cad.'] - df['Data Nasc.'])/365).dt.days).round().astype('Int64')
-
-    return df
+st.set_page_config(layout='wide')
 
+PAINEIS = {
+    'Visão geral': painel_visao_geral,
+    'Convênios': painel_convenios,
+    'Análise por sexo': painel_sexo,
+    'Análise por faixa de idade': painel_faixa_idade,
+}
 
-st.set_page_config(layout='wide')
-dados = carregar_dados()
 
-dados['ano_mes'] = dados['Data Cad.'].dt.to_period(
-    'M').astype('datetime64[ns]')
+@st.cache_resource(max_entries=16, show_spinner=False)
+def calcular_painel(pagina, versao):
+    # Tabelas e figuras de cada página por versão do arquivo: ao voltar a uma
+    # página, as figuras prontas só são serializadas, sem groupby nem px.*.
+    # É o mesmo objeto para todas as sessões, então é somente leitura.
+    executou()
+    if pagina == 'Exames':
+        return painel_exames(*obter_exames())
+    return reduzir_painel(PAINEIS[pagina](obter_fonte()))
 
-bins = [0, 17, 25, 35, 45, 60, 100]  # limites das faixas
-labels = ['0-17', '18-25', '26-35', '36-45', '46-60', '60+']
-dados['Faixa_etária'] = pd.cut(
-    x=dados['Idade'],
-    labels=labels,
-    bins=bins
-)
 
+def recarregar():
+    invalidar_pacientes()
+    calcular_painel.clear()
 
-dados.drop(3956, axis='index', inplace=True)
 
-contagem = dados['Sexo'].value_counts()
-porcento = (dados['Sexo'].value_counts(normalize=True)*100)
+iniciar()
+versao = versao_pacientes()
+with secao('carga: pacientes', cache=True) as s:
+    dados = obter_fonte()
+    s['linhas'] = len(dados)
+# Uma vez por execução, fora dos caches da carga
+for aviso in avisos_pacientes():
+    st.warning(aviso)
 
 with st.sidebar:
     st.title('REDE SANTA SAÚDE💊')
@@ -51,8 +54,14 @@ with st.sidebar:
         options=['Visão geral', 'Exames', 'Convênios', 'Análise por sexo',
                  'Análise por faixa de idade']
     )
+    st.button('Recarregar dados', on_click=recarregar)
 
 if selected == 'Visão geral':
+    with secao('Visão geral: cálculo', cache=True):
+        painel = calcular_painel(selected, versao)
+    contagem = painel['contagem_sexo']
+    porcento = painel['porcentagem_sexo']
+
     st.subheader('Análise por Sexo')
     co1, co2 = st.columns(2)
     with co1:
@@ -64,8 +73,8 @@ if selected == 'Visão geral':
         st.metric('Porcentagem de homens', f'{porcento[1]:.1f}%')
 
     st.subheader('Análise por Faixa Etária')
-    contagem_faixa = dados['Faixa_etária'].value_counts()
-    porcentagem_faixa = dados['Faixa_etária'].value_counts(normalize=True)*100
+    contagem_faixa = painel['contagem_faixa']
+    porcentagem_faixa = painel['porcentagem_faixa']
 
     # Criar colunas para exibir as métricas de faixa etária
     cols = st.columns(3)  # 3 colunas para melhor distribuição
@@ -78,138 +87,64 @@ if selected == 'Visão geral':
                 f'{porcentagem_faixa[faixa]:.1f}%'
             )
 
-    st.subheader('Ticket médio (R$) por mês📊')
-    conta_simples = dados.groupby(['ano_mes'])['Valor Final'].mean()
-    fig = px.bar(conta_simples, x=conta_simples.index,
-                 y=conta_simples.values, text=conta_simples.values)
+    with secao('Visão geral: ticket médio por mês'):
+        st.subheader('Ticket médio (R$) por mês📊')
+        st.plotly_chart(painel['ticket_medio_mes'])
 
-    fig.update_layout(
-        yaxis_title='',
-        xaxis_title='Período',
-        yaxis=dict(showticklabels=False)  # Remove os valores do eixo Y
-
-    )
-
-    fig.update_traces(
-        texttemplate='%{text:.1f}'
-    )
-    st.plotly_chart(fig)
+    with secao('Visão geral: mediana e P90 por mês'):
+        st.subheader('Mediana e P90 do valor (R$) por mês')
+        st.plotly_chart(painel['quantis_mes'])
 
 if selected == 'Exames':
+    with secao('Exames: cálculo', cache=True):
+        painel = calcular_painel(selected, versao)
+
     st.subheader('10 exames mais frequentes no conjunto de dados')
-    lista_exames = []
-    for lista in dados['Exames']:
-        for valor in lista.split(','):
-            lista_exames.append(valor.strip())
-
-    lista_exames = pd.Series(lista_exames)
-    exames_gerais = pd.DataFrame({
-        'Exame': lista_exames.value_counts().index[:10],
-        'Quantidade': lista_exames.value_counts().values[:10]
-    }).set_index('Exame')
-    st.dataframe(exames_gerais)
+    st.dataframe(painel['exames_gerais'])
     st.divider()
 
     st.subheader('Exames mais frequentes para cada sexo')
-    df_exames = dados.copy()
-    df_exames['Exames_Lista'] = df_exames['Exames'].str.split(',')
-    df_exames = df_exames.explode('Exames_Lista')
-    df_exames['Exames_Lista'] = df_exames['Exames_Lista'].str.strip()
-
-    f = df_exames.query('Sexo == "F"')
-    m = df_exames.query('Sexo == "M"')
 
     co1, co2 = st.columns(2)
     with co1:
         st.write("**Feminino**")
-        feminino = f.groupby(['Exames_Lista']).size(
-        ).sort_values(ascending=False).head(10)
-        tabela_feminino = pd.DataFrame({
-            'Exame': feminino.index,
-            'Quantidade': feminino.values
-        }).set_index('Exame')
-        st.dataframe(tabela_feminino)
+        st.dataframe(painel['feminino'])
 
     with co2:
         st.write("**Masculino**")
-        masculino = m.groupby(['Exames_Lista']).size(
-        ).sort_values(ascending=False).head(10)
-        tabela_masculino = pd.DataFrame({
-            'Exame': masculino.index,
-            'Quantidade': masculino.values
-        }).set_index('Exame')
-        st.dataframe(tabela_masculino)
+        st.dataframe(painel['masculino'])
 
     st.divider()
     st.subheader('5 exames mais frequentes por faixa etária')
 
-    # Lista das faixas etárias
-    faixas_etarias = ['0-17', '18-25', '26-35', '36-45', '46-60', '60+']
-
     # Criar colunas para exibir as tabelas lado a lado
     cols = st.columns(3)  # 3 colunas para melhor visualização
 
-    for i, faixa in enumerate(faixas_etarias):
-        # Filtrar dados por faixa etária
-        dados_faixa = df_exames.query(f'Faixa_etária == "{faixa}"')
-
-        # Agrupar e contar os exames mais frequentes
-        exames_frequentes = dados_faixa.groupby(
-            'Exames_Lista').size().sort_values(ascending=False).head(5)
-
-        # Criar DataFrame com nomes de colunas apropriados
-        tabela_faixa = pd.DataFrame({
-            'Exame': exames_frequentes.index,
-            'Quantidade': exames_frequentes.values
-        }).set_index('Exame')
-
+    for i, faixa in enumerate(LABELS):
         # Exibir em colunas
         with cols[i % 3]:
             st.write(f"**Faixa {faixa} anos**")
-            st.dataframe(tabela_faixa)
+            st.dataframe(painel['faixas'][faixa])
 
 if selected == 'Convênios':
-    st.subheader('Ticket Médio por mês por convênio')
-    conta_complexa = dados.groupby(['ano_mes', 'Convênio'])[
-        'Valor Final'].mean().reset_index()
-    fig = px.bar(conta_complexa, x='ano_mes',
-                 y='Valor Final', text='Valor Final', color='Convênio')
+    with secao('Convênios: cálculo', cache=True):
+        painel = calcular_painel(selected, versao)
 
-    fig.update_layout(
-        yaxis_title='',
-        xaxis_title='Período',
-        yaxis=dict(showticklabels=False)  # Remove os valores do eixo Y
-
-    )
-
-    fig.update_traces(
-        texttemplate='%{text:.1f}'
-    )
-    st.plotly_chart(fig)
+    with secao('Convênios: ticket médio por mês'):
+        st.subheader('Ticket Médio por mês por convênio')
+        st.plotly_chart(painel['ticket_medio_mes'])
 
     st.divider()
 
-    st.subheader('Proporção dos convênios no valor total por mês')
-
-    valor_conv = dados.groupby(['ano_mes', 'Convênio'])[
-        'Valor Final'].sum().reset_index().set_index('ano_mes')
-    valor_mensal = dados.groupby(
-        'ano_mes')['Valor Final'].sum().reset_index().set_index('ano_mes')
-
-    valor_conv['Porcentagem'] = (valor_conv['Valor Final'].div(
-        valor_mensal['Valor Final'], axis=0)*100)
-    valor_conv['Porcentagem'] = [
-        f'{v:.1f}%' for v in valor_conv['Porcentagem']]
-
-    fig = px.bar(valor_conv, x=valor_conv.index,
-                 y='Porcentagem', color='Convênio', text_auto=True)
-    st.plotly_chart(fig)
+    with secao('Convênios: proporção no valor'):
+        st.subheader('Proporção dos convênios no valor total por mês')
+        st.plotly_chart(painel['proporcao_valor'])
 
 if selected == 'Análise por sexo':
+    with secao('Sexo: cálculo', cache=True):
+        painel = calcular_painel(selected, versao)
 
-    ticket_medio = dados.groupby('Sexo').agg(
-        ticket_medio=('Valor Final', 'mean')
-    )
+    ticket_medio = painel['ticket_medio']
     co1, co2 = st.columns(2)
     with co1:
         st.metric('Ticket médio das mulheres',
@@ -219,87 +154,40 @@ if selected == 'Análise por sexo':
         st.metric('Ticket médio dos homens',
                   f'R${ticket_medio["ticket_medio"][1]:.1f}')
 
-    st.subheader('Ticket médio (R$) por convênio por sexo📊')
-    ticket_medio_conv = pd.crosstab(
-        index=dados['Convênio'], columns=dados['Sexo'], values=dados['Valor Final'], aggfunc='mean').fillna(0).sort_values(by='F', ascending=False).reset_index()
+    with secao('Sexo: quantis do valor'):
+        st.subheader('Distribuição do valor (R$) por sexo')
+        st.dataframe(painel['quantis_sexo'])
+        st.plotly_chart(painel['caixas_sexo'])
 
-    fig = px.bar(ticket_medio_conv, x='Convênio',
-                 y=['F', 'M'], text_auto='.2f')
-
-    fig.update_layout(
-        yaxis_title='',
-        xaxis_title='Período',
-        yaxis=dict(showticklabels=False)  # Remove os valores do eixo Y
-
-    )
-
-    st.plotly_chart(fig)
+    with secao('Sexo: ticket médio por convênio'):
+        st.subheader('Ticket médio (R$) por convênio por sexo📊')
+        st.plotly_chart(painel['ticket_medio_convenio'])
 
     st.divider()
-    st.subheader('Evolução mensal do valor total por sexo')
-
-    sexo_valor = dados.groupby(['ano_mes', 'Sexo'])[
-        'Valor Final'].sum().reset_index()
-
-    fig = px.line(sexo_valor, x='ano_mes', y='Valor Final', color='Sexo')
-    st.plotly_chart(fig)
+    with secao('Sexo: evolução mensal'):
+        st.subheader('Evolução mensal do valor total por sexo')
+        st.plotly_chart(painel['evolucao_valor'])
 
 if selected == 'Análise por faixa de idade':
+    with secao('Faixa de idade: cálculo', cache=True):
+        painel = calcular_painel(selected, versao)
 
-    st.subheader('Ticket médio (R$) por faixa etária📊')
-    ticket_medio_idade = dados.groupby('Faixa_etária').agg(
-        ticket_medio=('Valor Final', 'mean')
-    ).reset_index()
+    with secao('Faixa de idade: ticket médio'):
+        st.subheader('Ticket médio (R$) por faixa etária📊')
+        st.plotly_chart(painel['ticket_medio_faixa'])
 
-    fig = px.bar(ticket_medio_idade, x='Faixa_etária',
-                 y='ticket_medio', text='ticket_medio')
+    with secao('Faixa de idade: ticket médio por convênio'):
+        st.subheader('Ticket médio (R$) por convênio por faixa etária📊')
+        st.plotly_chart(painel['ticket_medio_convenio_faixa'])
 
-    fig.update_layout(
-        yaxis_title='',
-        xaxis_title='Período',
-        yaxis=dict(showticklabels=False)  # Remove os valores do eixo Y
-
-    )
-    fig.update_traces(
-        texttemplate='%{text:.2f}'
-    )
-
-    st.plotly_chart(fig)
-
-    st.subheader('Ticket médio (R$) por convênio por faixa etária📊')
-    ticket_medio_conv_idade = pd.crosstab(
-        index=dados['Convênio'], columns=dados['Faixa_etária'], values=dados['Valor Final'], aggfunc='mean').fillna(0)
-
-    fig = px.bar(ticket_medio_conv_idade, x=ticket_medio_conv_idade.index,
-                 y=ticket_medio_conv_idade.columns, text_auto='.2f')
-
-    fig.update_layout(
-        yaxis_title='',
-        xaxis_title='Período',
-        yaxis=dict(showticklabels=False)
-    )
-
-    st.plotly_chart(fig)
-
-    st.subheader('Análise da faixa etária por sexo📊')
-    faixa_por_sexo = pd.crosstab(
-        index=dados['Faixa_etária'], columns=dados['Sexo']
-    )
-    fig = px.bar(faixa_por_sexo, x=faixa_por_sexo.index,
-                 y=faixa_por_sexo.columns, text_auto=True)
-    fig.update_layout(
-        yaxis_title='',
-        xaxis_title='Período',
-        yaxis=dict(showticklabels=False)
-    )
-    st.plotly_chart(fig)
+    with secao('Faixa de idade: por sexo'):
+        st.subheader('Análise da faixa etária por sexo📊')
+        st.plotly_chart(painel['faixa_por_sexo'])
 
     st.divider()
 
-    st.subheader('Evolução mensal do valor total por faixa etária')
-    grupo_faixa = dados.groupby(['ano_mes', 'Faixa_etária'])[
-        'Valor Final'].sum().reset_index()
+    with secao('Faixa de idade: evolução mensal'):
+        st.subheader('Evolução mensal do valor total por faixa etária')
+        st.plotly_chart(painel['evolucao_valor'])
 
-    line = px.line(grupo_faixa, x='ano_mes',
-                   y='Valor Final', color='Faixa_etária')
-    st.plotly_chart(line)
+mostrar()
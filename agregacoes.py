@@ -0,0 +1,172 @@
+"""Agregações dos painéis, independentes do motor de consulta.
+
+Os painéis chamam estas funções em vez de `groupby`, `value_counts` e
+`crosstab` direto. Com um DataFrame, elas usam o pandas, como antes. Com a
+fonte de um motor de consulta (motor_duckdb.py, motor_polars.py), o motor
+faz o agrupamento e devolve só a tabela agrupada, que aqui recebe o mesmo
+formato do resultado do pandas: índice, dtypes categóricos, combinações não
+observadas e ordem.
+
+Uma fonte de motor implementa:
+
+    agrupar(por, medidas, nulos)  DataFrame com as colunas `por` e uma
+                                  coluna por item de `medidas`, um dict
+                                  {nome: (coluna, funcao)}; funcao é 'sum',
+                                  'mean' ou 'count' (linhas; coluna=None).
+                                  Chaves nulas só formam grupo com `nulos`
+                                  (como dropna=False)
+    categorias(coluna)            CategoricalDtype da coluna, ou None
+    filtrar(convenio, exames)     nova fonte restrita (cubo)
+    distintos(coluna)             valores distintos da coluna
+    len(fonte)                    número de linhas
+    contar_exames(por)            opcional: contagem de exames como em
+                                  exames.py; sem ela, o painel de exames usa
+                                  o pandas
+
+O motor dos relatórios é escolhido por CLINICA_MOTOR: 'pandas' (padrão),
+'duckdb' ou 'polars'. Cada motor externo fica em motor_<nome>.py, com
+`fonte_cubo(planilha, avisar)` e `fonte_pacientes(caminho, avisar)`.
+"""
+import importlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from exames import contar_exames, contar_exames_por
+from quantis import quantis
+
+MOTORES = ['pandas', 'duckdb', 'polars']
+MOTOR = os.environ.get('CLINICA_MOTOR', 'pandas')
+
+
+def modulo_motor(motor=MOTOR):
+    """Módulo do motor externo, importado só quando escolhido."""
+    if motor not in MOTORES[1:]:
+        raise ValueError(f'motor desconhecido: {motor!r} (use um de {MOTORES})')
+    return importlib.import_module(f'motor_{motor}')
+
+
+def e_pandas(dados):
+    return isinstance(dados, pd.DataFrame)
+
+
+def _lista(por):
+    return [por] if isinstance(por, str) else list(por)
+
+
+def _nivel(fonte, tabela, coluna):
+    valores = tabela[coluna]
+    tipo = fonte.categorias(coluna)
+    if tipo is not None:
+        return pd.Index(valores.astype(tipo), name=coluna)
+    if pd.api.types.is_datetime64_any_dtype(valores):
+        valores = valores.astype('datetime64[ns]')
+    return pd.Index(valores, name=coluna)
+
+
+def _todas(fonte, nivel):
+    # Valores do nível quando o pandas usa observed=False
+    tipo = fonte.categorias(nivel.name)
+    if tipo is not None:
+        return pd.CategoricalIndex(tipo.categories, dtype=tipo, name=nivel.name)
+    return nivel.unique().sort_values()
+
+
+def agrupar(fonte, por, medidas, nulos=False):
+    """`fonte.agrupar` com o índice do pandas: chaves `por`, em ordem."""
+    por = _lista(por)
+    tabela = fonte.agrupar(por, medidas, nulos)
+    niveis = [_nivel(fonte, tabela, c) for c in por]
+    tabela.index = niveis[0] if len(por) == 1 else pd.MultiIndex.from_arrays(niveis)
+    return tabela[list(medidas)].sort_index()
+
+
+def _agrupado(fonte, por, coluna, funcao, observado=True):
+    serie = agrupar(fonte, por, {'valor': (coluna, funcao)})['valor'].rename(coluna)
+
+    if not observado:
+        niveis = [serie.index] if serie.index.nlevels == 1 else \
+            [serie.index.get_level_values(n) for n in range(serie.index.nlevels)]
+        todas = [_todas(fonte, n) for n in niveis]
+        completo = todas[0] if len(todas) == 1 else pd.MultiIndex.from_product(todas)
+        serie = serie.reindex(completo, fill_value=0 if funcao != 'mean' else np.nan)
+    return serie
+
+
+def media(dados, por, coluna, observado=True):
+    """Média de `coluna` por `por` (groupby(...).mean())."""
+    if e_pandas(dados):
+        return dados.groupby(por, observed=observado)[coluna].mean()
+    return _agrupado(dados, por, coluna, 'mean', observado)
+
+
+def soma(dados, por, coluna, observado=True):
+    """Soma de `coluna` por `por` (groupby(...).sum())."""
+    if e_pandas(dados):
+        return dados.groupby(por, observed=observado)[coluna].sum()
+    return _agrupado(dados, por, coluna, 'sum', observado)
+
+
+def contagem(dados, coluna, normalizar=False):
+    """Linhas por valor de `coluna`, em ordem decrescente (value_counts()).
+
+    Valores empatados ficam na ordem dos valores (das categorias).
+    """
+    if e_pandas(dados):
+        # Empates na ordem dos valores (das categorias), como nos motores; o
+        # value_counts() ordenaria os empates de forma arbitrária
+        serie = dados[coluna].value_counts(normalize=normalizar, sort=False).sort_index()
+        return serie.sort_values(ascending=False, kind='stable')
+    serie = _agrupado(dados, coluna, None, 'count', observado=False)
+    if normalizar:
+        serie = serie / serie.sum()
+    serie = serie.sort_values(ascending=False, kind='stable')
+    return serie.rename('proportion' if normalizar else 'count')
+
+
+def cruzar(dados, linhas, colunas, valores=None):
+    """Tabela cruzada: média de `valores`, ou contagem de linhas (crosstab)."""
+    if e_pandas(dados):
+        return pd.crosstab(
+            index=dados[linhas], columns=dados[colunas],
+            values=None if valores is None else dados[valores],
+            aggfunc=None if valores is None else 'mean')
+    funcao = 'count' if valores is None else 'mean'
+    tabela = _agrupado(dados, [linhas, colunas], valores, funcao).unstack(colunas)
+    if valores is None:
+        tabela = tabela.fillna(0).astype('int64')
+    tabela.columns.name = colunas
+    return tabela
+
+
+def contagem_exames(dados, indice, por=None, k=None):
+    """Contagem de cada exame; com `por`, um dicionário {valor: contagem}.
+
+    Com `k`, só os `k` exames mais frequentes (de cada valor). Com pandas,
+    usa o índice paciente × exame (ver exames.py); uma fonte de motor conta
+    pela própria coluna 'Exames' e `indice` é ignorado.
+    """
+    if e_pandas(dados):
+        return contar_exames(indice, k) if por is None else \
+            contar_exames_por(indice, dados[por], k)
+    contagem = dados.contar_exames(por)
+    if k is None:
+        return contagem
+    if por is None:
+        return contagem.head(k)
+    return {valor: serie.head(k) for valor, serie in contagem.items()}
+
+
+def distribuicao(dados, por, balde='balde'):
+    """Quantis (QUANTIS de quantis.py) por `por`, juntando os esboços.
+
+    `balde` é a coluna com o balde de cada linha; o esboço de cada grupo é a
+    contagem de linhas por balde.
+    """
+    por = _lista(por)
+    if e_pandas(dados):
+        contagens = dados.groupby(por + [balde], observed=True).size()
+    else:
+        contagens = _agrupado(dados, por + [balde], None, 'count')
+    return quantis(contagens)
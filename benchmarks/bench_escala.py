@@ -0,0 +1,154 @@
+"""Tempos de carga, preparo e de cada painel em várias escalas de dados.
+
+Para cada escala são gerados dados sintéticos (ver dados_sinteticos.py) com
+o mesmo número de linhas de exame e de pacientes, gravados em Parquet (o
+formato dos snapshots) e medidos etapa a etapa. O resultado é uma tabela
+etapa × escala; com --csv as medições são acrescentadas a um arquivo, para
+comparar versões e desenhar curvas de escala.
+
+Uso:
+    python benchmarks/bench_escala.py --escalas 10000 100000 1000000
+    python benchmarks/bench_escala.py --escalas 10000 --excel-ate 100000 --csv tempos.csv
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compactacao import (ESQUEMA_CUBO, ESQUEMA_LINHAS,  # noqa: E402
+                         ESQUEMA_PACIENTES, compactar)
+from cubo import montar_cubo  # noqa: E402
+from dados_sinteticos import gravar  # noqa: E402
+from exames import indexar_exames  # noqa: E402
+from ingestao import COLUNAS, preparar_linhas  # noqa: E402
+from janelas import indexar_datas, janela, por_dimensao, resumo  # noqa: E402
+from leitura import ler_blocos  # noqa: E402
+from pacientes import preparar_pacientes  # noqa: E402
+from paineis import (painel_convenio, painel_convenios,  # noqa: E402
+                     painel_exames, painel_faixa_idade, painel_sexo,
+                     painel_temporal, painel_tipo_exame, painel_visao_geral)
+
+ESCALAS = [10_000, 100_000, 1_000_000]
+
+
+def _ignorar(mensagem):
+    pass
+
+
+def _janelas_recentes(indice):
+    for dias in (1, 7, 30):
+        periodo = janela(indice, dias)
+        resumo(indice, *periodo)
+        por_dimensao(indice, 'Convênio', *periodo)
+        por_dimensao(indice, 'Descrição', *periodo)
+
+
+def etapas(pasta, n, excel):
+    """Gera as etapas (nome, função) de uma escala; cada uma usa a anterior."""
+    linhas_pq = os.path.join(pasta, 'linhas.parquet')
+    pacientes_pq = os.path.join(pasta, 'pacientes.parquet')
+    estado = {}
+
+    if excel:
+        linhas_xlsx = os.path.join(pasta, 'linhas.xlsx')
+        gravar('linhas', n, linhas_xlsx)
+        yield 'linhas: read_excel', lambda: pd.read_excel(linhas_xlsx)
+        yield 'linhas: leitura em blocos', lambda: sum(
+            len(b) for b in ler_blocos(linhas_xlsx, colunas=COLUNAS))
+
+    def ler_linhas():
+        estado['linhas'] = pd.read_parquet(linhas_pq)
+
+    def preparar():
+        estado['preparadas'], _ = preparar_linhas(estado['linhas'].copy())
+
+    def cubo():
+        linhas = compactar(estado['preparadas'], ESQUEMA_LINHAS)
+        estado['cubo'] = compactar(montar_cubo(linhas), ESQUEMA_CUBO)
+
+    def indice_datas():
+        estado['indice_datas'] = indexar_datas(estado['cubo'])
+
+    yield 'linhas: leitura parquet', ler_linhas
+    yield 'linhas: preparo', preparar
+    yield 'linhas: cubo', cubo
+    yield 'linhas: índice de datas', indice_datas
+    yield 'recente: janelas 1/7/30', lambda: _janelas_recentes(estado['indice_datas'])
+    for nome, painel in [('tipo de exame', painel_tipo_exame),
+                         ('temporal', painel_temporal),
+                         ('convênio', painel_convenio)]:
+        yield f'geral: {nome}', lambda painel=painel: painel(estado['cubo'])
+
+    def ler_pacientes():
+        estado['pacientes'] = pd.read_parquet(pacientes_pq)
+
+    def preparar_pac():
+        estado['dados'] = preparar_pacientes(estado['pacientes'].copy(), _ignorar)
+
+    def indice_exames():
+        estado['indice_exames'] = indexar_exames(estado['dados']['Exames'])
+
+    yield 'pacientes: leitura parquet', ler_pacientes
+    yield 'pacientes: preparo', preparar_pac
+    yield 'pacientes: compactação', lambda: compactar(estado['dados'], ESQUEMA_PACIENTES)
+    yield 'pacientes: índice de exames', indice_exames
+    for nome, painel in [('visão geral', painel_visao_geral),
+                         ('convênios', painel_convenios),
+                         ('sexo', painel_sexo),
+                         ('faixa de idade', painel_faixa_idade)]:
+        yield f'pacientes: {nome}', lambda painel=painel: painel(estado['dados'])
+    yield 'pacientes: exames', lambda: painel_exames(
+        estado['dados'], estado['indice_exames'])
+
+
+def medir(n, excel=False):
+    """Lista de (etapa, segundos) para `n` linhas de cada conjunto."""
+    with tempfile.TemporaryDirectory() as pasta:
+        gravar('linhas', n, os.path.join(pasta, 'linhas.parquet'))
+        gravar('pacientes', n, os.path.join(pasta, 'pacientes.parquet'))
+        tempos = []
+        for nome, funcao in etapas(pasta, n, excel):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append((nome, time.perf_counter() - inicio))
+        return tempos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escalas', type=int, nargs='+', default=ESCALAS)
+    parser.add_argument('--excel-ate', type=int, default=0,
+                        help='mede também a leitura do xlsx até esta escala')
+    parser.add_argument('--csv', help='acrescenta as medições a este arquivo')
+    args = parser.parse_args(argv)
+
+    # Avisos do pandas (depreciação, formato de datas) poluiriam a tabela
+    warnings.simplefilter('ignore', FutureWarning)
+    warnings.simplefilter('ignore', UserWarning)
+    registros = []
+    for n in args.escalas:
+        for etapa, segundos in medir(n, excel=n <= args.excel_ate):
+            registros.append({'escala': n, 'etapa': etapa, 'segundos': segundos})
+        print(f'{n} linhas: ok', file=sys.stderr)
+
+    resultado = pd.DataFrame(registros)
+    tabela = resultado.pivot(index='etapa', columns='escala', values='segundos')
+    tabela = tabela.reindex(resultado['etapa'].drop_duplicates())
+    pd.set_option('display.width', 200)
+    print(tabela.round(3).to_string())
+
+    if args.csv:
+        resultado.insert(0, 'quando', pd.Timestamp.now().isoformat(timespec='seconds'))
+        resultado.to_csv(args.csv, mode='a', index=False,
+                         header=not os.path.exists(args.csv))
+
+
+if __name__ == '__main__':
+    main()
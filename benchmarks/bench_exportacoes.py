@@ -0,0 +1,76 @@
+"""Carga de uma pasta de exportações mensais com 1, 2, 4... processos.
+
+Gera uma planilha xlsx de pacientes por mês e por unidade (ver
+dados_sinteticos.py) e mede `ler_exportacoes` sobre a pasta, sem snapshots,
+com cada número de processos. A conversão de cada planilha é independente,
+então o tempo deve cair quase na proporção dos núcleos disponíveis.
+
+Uso:
+    python benchmarks/bench_exportacoes.py --meses 12 --unidades 2 --processos 1 2 4
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PASTA = tempfile.mkdtemp(prefix='bench_exportacoes_')
+os.environ['CLINICA_SNAPSHOTS'] = os.path.join(PASTA, 'snapshots')
+
+from dados_sinteticos import gravar  # noqa: E402
+from exportacoes import ler_exportacoes  # noqa: E402
+
+
+def gerar(pasta, meses, unidades, linhas):
+    """Grava `meses` × `unidades` planilhas de `linhas` pacientes cada."""
+    inicios = pd.date_range('2024-01-01', periods=meses, freq='MS')
+    for unidade in range(unidades):
+        destino = os.path.join(pasta, f'unidade_{unidade + 1}')
+        os.makedirs(destino)
+        for inicio in inicios:
+            fim = inicio + pd.offsets.MonthEnd()
+            gravar('pacientes', linhas, os.path.join(destino, f'{inicio:%Y-%m}.xlsx'),
+                   semente=unidade, inicio=inicio, fim=fim)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--meses', type=int, default=12)
+    parser.add_argument('--unidades', type=int, default=2)
+    parser.add_argument('--linhas', type=int, default=10_000,
+                        help='pacientes por planilha')
+    parser.add_argument('--processos', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter('ignore', UserWarning)
+    exportacoes = os.path.join(PASTA, 'exportacoes')
+    try:
+        gerar(exportacoes, args.meses, args.unidades, args.linhas)
+        registros = []
+        for processos in args.processos:
+            shutil.rmtree(os.environ['CLINICA_SNAPSHOTS'], ignore_errors=True)
+            inicio = time.perf_counter()
+            df = ler_exportacoes(exportacoes, processos)
+            segundos = time.perf_counter() - inicio
+            registros.append({'processos': processos, 'segundos': segundos,
+                              'linhas': len(df)})
+            print(f'{processos} processo(s): ok', file=sys.stderr)
+    finally:
+        shutil.rmtree(PASTA, ignore_errors=True)
+
+    resultado = pd.DataFrame(registros).set_index('processos')
+    resultado['aceleração'] = resultado['segundos'].iloc[0] / resultado['segundos']
+    print(f'{args.meses * args.unidades} planilhas de {args.linhas} linhas '
+          f'({os.cpu_count()} CPUs)')
+    print(resultado.round(3).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Compara o parser vetorizado de moeda com a list comprehension antiga.
+
+Uso: python benchmarks/bench_moeda.py [--linhas 1000000] [--repeticoes 3]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from moeda import converter_moeda  # noqa: E402
+
+
+def gerar_valores(linhas, semente=0):
+    rng = np.random.default_rng(semente)
+    centavos = rng.integers(0, 500_000, linhas)
+    texto = [f'{c / 100:,.2f}'.replace(',', 'X').replace('.', ',').replace('X', '.')
+             for c in centavos]
+    return pd.Series(['R$\xa0' + t for t in texto])
+
+
+def comprehension_antiga(serie):
+    # Código que estava em Segundo_relatório.carregar_dados
+    valores = pd.Series([f'{v}'.replace(',', '.').replace(
+        '.', '').replace('R$\xa0', '') for v in serie])
+    return valores.astype('float')/100
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    serie = gerar_valores(args.linhas)
+    antigo = comprehension_antiga(serie)
+    novo, invalidos = converter_moeda(serie)
+    assert len(invalidos) == 0
+    assert np.allclose(antigo.to_numpy(), novo.to_numpy())
+
+    print(f'{args.linhas} linhas, melhor de {args.repeticoes}:')
+    for nome, funcao in [('comprehension', comprehension_antiga),
+                         ('vetorizado', converter_moeda)]:
+        tempo = min(timeit.repeat(lambda: funcao(serie),
+                                  number=1, repeat=args.repeticoes))
+        print(f'  {nome:<14} {tempo:8.3f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Carga e painéis com o pandas e com o motor Polars em várias escalas.
+
+Para cada escala são gerados dados sintéticos (ver dados_sinteticos.py) em
+Parquet, o formato dos snapshots. O pandas lê o arquivo e prepara as
+colunas etapa a etapa (preparar_linhas, montar_cubo, preparar_pacientes);
+o Polars executa o mesmo preparo como um plano preguiçoso (ver
+motor_polars.py). Depois, cada painel é calculado sobre as duas fontes e os
+resultados são comparados (ver paridade.py). O painel de exames inclui a
+montagem da tabela paciente × exame, feita na primeira consulta.
+
+Uso:
+    python benchmarks/bench_motores.py --escalas 100000 1000000 10000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+import polars as pl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agregacoes import e_pandas  # noqa: E402
+from compactacao import (ESQUEMA_CUBO, ESQUEMA_LINHAS,  # noqa: E402
+                         ESQUEMA_PACIENTES, compactar)
+from cubo import montar_cubo  # noqa: E402
+from dados_sinteticos import gravar  # noqa: E402
+from exames import indexar_exames  # noqa: E402
+from ingestao import preparar_linhas  # noqa: E402
+from motor_polars import (CATEGORICAS, LABELS, FontePolars,  # noqa: E402
+                          preparar_cubo, preparar_pacientes)
+from paineis import (painel_convenio, painel_convenios,  # noqa: E402
+                     painel_exames, painel_faixa_idade, painel_sexo,
+                     painel_temporal, painel_tipo_exame, painel_visao_geral)
+from paridade import diferenca, itens  # noqa: E402
+from pacientes import preparar_pacientes as preparar_pacientes_pandas  # noqa: E402
+
+ESCALAS = [100_000, 1_000_000]
+
+PAINEIS = [
+    ('tipo de exame', 'cubo', painel_tipo_exame),
+    ('temporal', 'cubo', painel_temporal),
+    ('convênio', 'cubo', painel_convenio),
+    ('visão geral', 'pacientes', painel_visao_geral),
+    ('convênios', 'pacientes', painel_convenios),
+    ('sexo', 'pacientes', painel_sexo),
+    ('faixa de idade', 'pacientes', painel_faixa_idade),
+    ('exames', 'exames', painel_exames),
+]
+
+
+def _ignorar(mensagem):
+    pass
+
+
+def _cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def _carga_pandas(linhas_pq, pacientes_pq):
+    linhas, _ = preparar_linhas(pd.read_parquet(linhas_pq))
+    cubo = compactar(montar_cubo(compactar(linhas, ESQUEMA_LINHAS)), ESQUEMA_CUBO)
+    pacientes = compactar(preparar_pacientes_pandas(
+        pd.read_parquet(pacientes_pq), _ignorar), ESQUEMA_PACIENTES)
+    return {'cubo': cubo, 'pacientes': pacientes}
+
+
+def _carga_polars(linhas_pq, pacientes_pq):
+    cubo = preparar_cubo(pl.scan_parquet(linhas_pq), _ignorar)
+    pacientes = preparar_pacientes(pl.scan_parquet(pacientes_pq), _ignorar)
+    return {'cubo': FontePolars(cubo, ['Convênio', 'Descrição']),
+            'pacientes': FontePolars(pacientes, CATEGORICAS, {'Faixa_etária': LABELS})}
+
+
+def _painel(dados, entrada, funcao):
+    if entrada != 'exames':
+        return funcao(dados[entrada])
+    # Nos dois motores a tabela paciente × exame é montada na primeira
+    # consulta dos exames, como nos relatórios
+    pacientes = dados['pacientes']
+    indice = indexar_exames(pacientes['Exames']) if e_pandas(pacientes) else None
+    return funcao(pacientes, indice)
+
+
+def medir(n):
+    """Lista de registros (etapa, motor, segundos) e diferenças para `n` linhas."""
+    with tempfile.TemporaryDirectory() as pasta:
+        linhas_pq = os.path.join(pasta, 'linhas.parquet')
+        pacientes_pq = os.path.join(pasta, 'pacientes.parquet')
+        gravar('linhas', n, linhas_pq)
+        gravar('pacientes', n, pacientes_pq)
+
+        registros, diferencas, dados = [], [], {}
+        for motor, carga in [('pandas', _carga_pandas), ('polars', _carga_polars)]:
+            dados[motor], segundos = _cronometrar(lambda: carga(linhas_pq, pacientes_pq))
+            registros.append(('carga', motor, segundos))
+
+        for nome, entrada, funcao in PAINEIS:
+            resultados = {}
+            for motor in dados:
+                resultados[motor], segundos = _cronometrar(
+                    lambda: dict(itens(_painel(dados[motor], entrada, funcao))))
+                registros.append((nome, motor, segundos))
+            for item, objeto in resultados['pandas'].items():
+                texto = diferenca(objeto, resultados['polars'][item])
+                if texto:
+                    diferencas.append(f'{n}: {nome}/{item}: {texto}')
+        return registros, diferencas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escalas', type=int, nargs='+', default=ESCALAS)
+    args = parser.parse_args(argv)
+
+    # Avisos do pandas (depreciação, formato de datas) poluiriam a tabela
+    warnings.simplefilter('ignore', FutureWarning)
+    warnings.simplefilter('ignore', UserWarning)
+    registros, diferencas = [], []
+    for n in args.escalas:
+        medidos, diferentes = medir(n)
+        registros += [{'escala': n, 'etapa': etapa, 'motor': motor, 'segundos': s}
+                      for etapa, motor, s in medidos]
+        diferencas += diferentes
+        print(f'{n} linhas: ok', file=sys.stderr)
+
+    resultado = pd.DataFrame(registros)
+    tabela = resultado.pivot(index='etapa', columns=['escala', 'motor'],
+                             values='segundos')
+    tabela = tabela.reindex(resultado['etapa'].drop_duplicates())
+    pd.set_option('display.width', 200)
+    print(tabela.round(3).to_string())
+
+    for texto in diferencas:
+        print('DIFERENTE', texto)
+    print('paridade ok' if not diferencas else f'{len(diferencas)} diferença(s)')
+
+
+if __name__ == '__main__':
+    main()
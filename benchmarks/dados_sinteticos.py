@@ -0,0 +1,258 @@
+"""Dados sintéticos no formato das planilhas dos relatórios.
+
+Gera linhas de exame (como `convenio_detalhado_linha.xlsx`: Data, Convênio,
+Descrição, Valor) e pacientes (como `paciente_por_data.xlsx`), com as mesmas
+colunas e formatos de texto (valor '1234,56' nas linhas e 'R$ 54,80' nos
+pacientes, datas '25/01/2024') e com a assimetria
+dos dados reais: poucos convênios e exames concentram a maior parte das
+linhas (pesos de Zipf), preços por exame e por convênio, mais mulheres que
+homens, etc.
+
+O catálogo (exames, preços, combinações de exames, nomes) depende só da
+semente, então arquivos gerados em blocos ou em tamanhos diferentes são
+coerentes entre si. Arquivos grandes são gravados em blocos, com memória
+limitada pelo tamanho do bloco; xlsx só até o limite de linhas do Excel.
+
+Uso:
+    python benchmarks/dados_sinteticos.py linhas 1000000 linhas.parquet
+    python benchmarks/dados_sinteticos.py pacientes 100000 paciente_por_data.xlsx
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+LIMITE_EXCEL = 1_048_575  # linhas de dados em uma aba (fora o cabeçalho)
+LINHAS_POR_BLOCO = 1_000_000
+
+INICIO = '2024-01-25'
+FIM = '2025-04-30'
+
+# Pesos aproximados da planilha real de pacientes
+CONVENIOS = {
+    'SUS': 0.45, 'PART': 0.32, 'IPES': 0.18, 'LASO': 0.025, 'SESI': 0.02,
+    'EMPRESAS': 0.007, 'LABORATORIO ASO': 0.004, 'GEAP': 0.0003,
+}
+# Preço cobrado em relação ao preço de tabela
+FATOR_CONVENIO = {
+    'SUS': 0.55, 'PART': 1.3, 'IPES': 0.9, 'LASO': 0.8, 'SESI': 0.85,
+    'EMPRESAS': 1.0, 'LABORATORIO ASO': 1.1, 'GEAP': 0.95,
+}
+EXAMES_COMUNS = [
+    'HG', 'GLI', 'URI', 'CREA', 'URE', 'TGO', 'TGP', 'TSH', 'VD', 'T4L', 'COL',
+    'HDL', 'LDL', 'HBGLI', 'TRI', 'VLDL', 'PPF', 'VHS', 'FER', 'GGT', 'FAL',
+    'BIL', 'PTH', 'HCG', 'HIV4', 'HBSAG', 'HCVT', 'ABO', 'SAN', 'PCR', 'AU',
+    'K', 'NA', 'CA', 'MG', 'PSA', 'B12', 'FOL', 'INS', 'GPP2H',
+]
+USUARIOS = [
+    'CINTIA REGINA LIMA SOUZA', 'GLICIA ALVES SANTOS',
+    'LUANA BAZILIO DE OLIVEIRA', 'NADJA NAJARA SILVA SANTOS',
+    'Almira Nunes Matos', 'VIVIAN MARIÁ SILVA SANTOS', 'LUANNY',
+    'aline juliane oliveira teixeira', 'SUZANE ANDRADE DA SILVA',
+    'LUANA GEYSE ANDRADE COSTA', 'Janine Mirelle Hora Alves',
+    'Jessica Cruz Gomes',
+]
+PRENOMES = [
+    'MARIA', 'JOSÉ', 'ANA', 'JOÃO', 'ANTONIO', 'FRANCISCA', 'CARLOS', 'PAULO',
+    'ADRIANA', 'LUCAS', 'JULIANA', 'MARCOS', 'FERNANDA', 'PEDRO', 'ALINE',
+    'RAFAEL', 'PATRICIA', 'DANIEL', 'ERIKA', 'ALOISIO', 'ALMIRA', 'GABRIEL',
+]
+SOBRENOMES = [
+    'SILVA', 'SANTOS', 'OLIVEIRA', 'SOUZA', 'LIMA', 'PEREIRA', 'COSTA',
+    'NASCIMENTO', 'ALVES', 'FERREIRA', 'RODRIGUES', 'MATOS', 'NUNES', 'CRUZ',
+    'DE JESUS', 'ANDRADE', 'TEIXEIRA', 'GOMES', 'HORA', 'SOARES',
+]
+
+
+def _zipf(n, s=1.1):
+    pesos = 1 / np.arange(1, n + 1) ** s
+    return pesos / pesos.sum()
+
+
+def _decimal(valores):
+    # '1234,56', como o Valor da planilha de linhas. Formata só os valores
+    # distintos (poucos) e espalha com `take`
+    unicos, posicao = np.unique(np.round(valores, 2), return_inverse=True)
+    texto = np.array([f'{v:.2f}'.replace('.', ',') for v in unicos], dtype=object)
+    return texto[posicao]
+
+
+def _moeda(valores):
+    # 'R$\xa01.234,56', como os valores da planilha de pacientes
+    unicos, posicao = np.unique(np.round(valores, 2), return_inverse=True)
+    texto = np.array(
+        ['R$\xa0' + f'{v:,.2f}'.replace(',', 'X').replace('.', ',').replace('X', '.')
+         for v in unicos], dtype=object)
+    return texto[posicao]
+
+
+def _datas_texto(datas):
+    unicas, posicao = np.unique(datas, return_inverse=True)
+    return pd.DatetimeIndex(unicas).strftime('%d/%m/%Y').to_numpy(object)[posicao]
+
+
+def catalogo(semente=0, n_exames=400, n_combinacoes=5000, n_nomes=50_000):
+    """Exames, preços de tabela, combinações de exames e nomes de pacientes."""
+    rng = np.random.default_rng(semente)
+    exames = EXAMES_COMUNS + [f'EXAME {i}' for i in
+                              range(1, n_exames - len(EXAMES_COMUNS) + 1)]
+    precos = np.round(rng.lognormal(np.log(20), 0.8, len(exames)), 2)
+    peso_exame = _zipf(len(exames), 0.9)
+
+    # Pedidos: muitos com 1 a 3 exames e a maioria com um painel de ~18
+    tamanhos = np.where(rng.random(n_combinacoes) < 0.3,
+                        rng.integers(1, 4, n_combinacoes),
+                        rng.normal(18, 8, n_combinacoes).round())
+    tamanhos = np.clip(tamanhos, 1, 70).astype(int)
+    combinacoes, preco_combinacao = [], np.empty(n_combinacoes)
+    for i, tamanho in enumerate(tamanhos):
+        escolhidos = rng.choice(len(exames), tamanho, replace=False, p=peso_exame)
+        combinacoes.append(', '.join(exames[j] for j in escolhidos))
+        preco_combinacao[i] = precos[escolhidos].sum()
+
+    nomes = (rng.choice(PRENOMES, n_nomes).astype(object) + ' ' +
+             rng.choice(SOBRENOMES, n_nomes).astype(object) + ' ' +
+             rng.choice(SOBRENOMES, n_nomes).astype(object))
+    return {
+        'exames': np.array(exames, dtype=object),
+        'precos': precos,
+        'peso_exame': peso_exame,
+        'combinacoes': np.array(combinacoes, dtype=object),
+        'preco_combinacao': preco_combinacao,
+        'peso_combinacao': _zipf(n_combinacoes, 0.8),
+        'nomes': nomes,
+    }
+
+
+def _dias_uteis(inicio, fim):
+    # Sem domingos, como na operação real
+    dias = pd.date_range(inicio, fim, freq='D')
+    return dias[dias.dayofweek != 6].to_numpy()
+
+
+def _convenios(rng, n):
+    nomes = np.array(list(CONVENIOS), dtype=object)
+    pesos = np.array(list(CONVENIOS.values()))
+    codigo = rng.choice(len(nomes), n, p=pesos / pesos.sum())
+    fator = np.array([FATOR_CONVENIO[c] for c in nomes])
+    return nomes[codigo], fator[codigo]
+
+
+def gerar_linhas(n, semente=0, inicio=INICIO, fim=FIM, cat=None):
+    """DataFrame com `n` linhas de exame, em ordem de data."""
+    cat = catalogo(semente) if cat is None else cat
+    rng = np.random.default_rng([semente, 1, n, pd.Timestamp(inicio).value])
+    datas = np.sort(rng.choice(_dias_uteis(inicio, fim), n))
+    convenio, fator = _convenios(rng, n)
+    exame = rng.choice(len(cat['exames']), n, p=cat['peso_exame'])
+    valor = cat['precos'][exame] * fator
+    return pd.DataFrame({
+        'Data': datas,
+        'Convênio': convenio,
+        'Descrição': cat['exames'][exame],
+        'Valor': _decimal(valor),
+    })
+
+
+def gerar_pacientes(n, semente=0, inicio=INICIO, fim=FIM, cat=None, primeiro_codigo=1):
+    """DataFrame com `n` pacientes, em ordem de data de cadastro."""
+    cat = catalogo(semente) if cat is None else cat
+    rng = np.random.default_rng([semente, 2, n, pd.Timestamp(inicio).value])
+    cadastro = np.sort(rng.choice(_dias_uteis(inicio, fim), n))
+    idade_dias = (np.clip(rng.normal(42, 18, n), 0, 95) * 365.25).astype(int)
+    nascimento = cadastro - idade_dias.astype('timedelta64[D]')
+    # Como na planilha real, a primeira data tem dia > 12: o pandas infere o
+    # formato (dia/mês ou mês/dia) pela primeira linha
+    if n and pd.Timestamp(nascimento[0]).day <= 12:
+        nascimento[0] -= np.timedelta64(pd.Timestamp(nascimento[0]).day, 'D')
+
+    convenio, fator = _convenios(rng, n)
+    combinacao = rng.choice(len(cat['combinacoes']), n, p=cat['peso_combinacao'])
+    valor = cat['preco_combinacao'][combinacao] * fator
+    # Alguns pedidos têm desconto no valor final
+    valor_final = np.where(rng.random(n) < 0.05, valor * 0.9, valor)
+    usuario = rng.choice(len(USUARIOS), n, p=_zipf(len(USUARIOS), 1.3))
+
+    return pd.DataFrame({
+        'Data Cad.': _datas_texto(cadastro),
+        'Código': np.arange(primeiro_codigo, primeiro_codigo + n),
+        'Paciente': rng.choice(cat['nomes'], n),
+        'Convênio': convenio,
+        'Exames': cat['combinacoes'][combinacao],
+        'Sexo': np.where(rng.random(n) < 0.66, 'F', 'M').astype(object),
+        'Data Nasc.': _datas_texto(nascimento),
+        'Valor R$': _moeda(valor),
+        'Valor Final': _moeda(valor_final),
+        'Nome do Usuário': np.array(USUARIOS, dtype=object)[usuario],
+    })
+
+
+def gerar_blocos(tipo, n, semente=0, inicio=INICIO, fim=FIM,
+                 linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Gera o conjunto em blocos consecutivos no tempo (ordem de data global)."""
+    cat = catalogo(semente)
+    n_blocos = max(1, -(-n // linhas_por_bloco))
+    limites = pd.date_range(inicio, fim, periods=n_blocos + 1).normalize()
+    feitas = 0
+    for i in range(n_blocos):
+        tamanho = min(linhas_por_bloco, n - feitas)
+        # Os blocos dividem o período; o último dia de um bloco não se repete
+        fim_bloco = limites[i + 1] - pd.Timedelta(days=0 if i == n_blocos - 1 else 1)
+        if tipo == 'linhas':
+            yield gerar_linhas(tamanho, semente, limites[i], fim_bloco, cat)
+        else:
+            yield gerar_pacientes(tamanho, semente, limites[i], fim_bloco, cat,
+                                  primeiro_codigo=feitas + 1)
+        feitas += tamanho
+
+
+def gravar(tipo, n, caminho, semente=0, inicio=INICIO, fim=FIM,
+           linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Grava o conjunto em .parquet, .csv ou .xlsx (escolhido pela extensão)."""
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao == '.xlsx' and n > LIMITE_EXCEL:
+        raise ValueError(f'o Excel aceita até {LIMITE_EXCEL} linhas; use .parquet ou .csv')
+
+    blocos = gerar_blocos(tipo, n, semente, inicio, fim, linhas_por_bloco)
+    if extensao == '.xlsx':
+        pd.concat(blocos, ignore_index=True).to_excel(caminho, index=False)
+        return
+
+    escritor = None
+    try:
+        for i, bloco in enumerate(blocos):
+            if extensao == '.csv':
+                bloco.to_csv(caminho, mode='w' if i == 0 else 'a', header=i == 0,
+                             index=False, sep=';', date_format='%d/%m/%Y')
+                continue
+            tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+            if escritor is None:
+                escritor = pq.ParquetWriter(caminho, tabela.schema)
+            escritor.write_table(tabela)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Gera dados sintéticos no formato das planilhas.')
+    parser.add_argument('tipo', choices=['linhas', 'pacientes'])
+    parser.add_argument('n', type=int, help='número de linhas')
+    parser.add_argument('caminho', help='arquivo de saída (.parquet, .csv ou .xlsx)')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--inicio', default=INICIO)
+    parser.add_argument('--fim', default=FIM)
+    parser.add_argument('--linhas-por-bloco', type=int, default=LINHAS_POR_BLOCO)
+    args = parser.parse_args(argv)
+
+    gravar(args.tipo, args.n, args.caminho, args.semente, args.inicio, args.fim,
+           args.linhas_por_bloco)
+    print(f'{args.caminho}: {args.n} linhas ({args.tipo})')
+
+
+if __name__ == '__main__':
+    main()
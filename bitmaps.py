@@ -0,0 +1,145 @@
+"""Índice invertido do cubo: de cada Convênio e Descrição às suas linhas.
+
+Para cada valor das colunas indexadas guardamos o conjunto das linhas do
+cubo em que ele aparece, em um de dois formatos, como nos Roaring bitmaps:
+
+    denso     bits empacotados (`np.packbits`, uint8): 1 bit por linha
+    esparso   posições das linhas em ordem (int32), quando ocupam menos
+              que o bitmap (valores em menos de 1/32 das linhas)
+
+Convênios, poucos, ficam densos; cada exame, raro, fica esparso. O índice é
+montado uma vez por versão do cubo; um filtro vira E/OU entre conjuntos,
+sem percorrer as colunas: OU entre exames junta listas de posições e o E
+com um convênio só consulta o bit dessas posições. Só as linhas
+selecionadas são copiadas para o agrupamento.
+
+    filtro = {'Convênio': ['SUS'], 'Descrição': ['GLICOSE', 'TGO']}
+    linhas = consultar(indice, filtro)   # SUS E (GLICOSE OU TGO)
+    cubo_filtrado = selecionar(indice, linhas)
+
+`e` e `ou` combinam conjuntos quaisquer (ex.: um convênio OU um exame).
+"""
+from functools import reduce
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+COLUNAS = ['Convênio', 'Descrição']
+
+
+class IndiceBitmaps(NamedTuple):
+    cubo: pd.DataFrame
+    bitmaps: dict  # coluna -> {valor: linhas (denso uint8 ou esparso int32)}
+
+
+def _denso(linhas, tamanho):
+    marcadas = np.zeros(tamanho, dtype=bool)
+    marcadas[linhas] = True
+    return np.packbits(marcadas)
+
+
+def _compactar(linhas, tamanho):
+    # O formato menor: 4 bytes por posição ou 1 bit por linha do cubo
+    if len(linhas) * 32 < tamanho:
+        return linhas.astype(np.int32)
+    return _denso(linhas, tamanho)
+
+
+def _esparso(linhas):
+    return linhas.dtype == np.int32
+
+
+def _bits(denso, posicoes):
+    # Bit de cada posição no bitmap denso
+    return (denso[posicoes >> 3] >> (7 - (posicoes & 7)).astype(np.uint8)) & 1
+
+
+def indexar_bitmaps(cubo, colunas=COLUNAS):
+    """Monta o conjunto de linhas de cada valor de cada coluna de `colunas`."""
+    bitmaps = {}
+    for coluna in colunas:
+        codigos, valores = pd.factorize(cubo[coluna], sort=True)
+        # Linhas agrupadas por valor: cada valor é um trecho de `ordem`
+        ordem = np.argsort(codigos, kind='stable')
+        inicios = np.searchsorted(codigos[ordem], np.arange(len(valores) + 1))
+        bitmaps[coluna] = {
+            valor: _compactar(ordem[inicios[i]:inicios[i + 1]], len(cubo))
+            for i, valor in enumerate(valores)}
+    return IndiceBitmaps(cubo, bitmaps)
+
+
+def todas(indice):
+    """Conjunto com todas as linhas do cubo."""
+    return np.packbits(np.ones(len(indice.cubo), dtype=bool))
+
+
+def nenhuma():
+    """Conjunto vazio."""
+    return np.zeros(0, dtype=np.int32)
+
+
+def _separar(conjuntos):
+    return ([c for c in conjuntos if _esparso(c)],
+            [c for c in conjuntos if not _esparso(c)])
+
+
+def e(*conjuntos):
+    """Interseção dos conjuntos de linhas (ao menos um)."""
+    esparsos, densos = _separar(conjuntos)
+    if not esparsos:
+        return reduce(np.bitwise_and, densos)
+    linhas = reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), esparsos)
+    if not densos:
+        return linhas
+    # Só os bits das linhas que sobraram são consultados
+    return linhas[_bits(reduce(np.bitwise_and, densos), linhas) == 1]
+
+
+def ou(*conjuntos):
+    """União dos conjuntos de linhas."""
+    esparsos, densos = _separar(conjuntos)
+    linhas = np.sort(np.concatenate([nenhuma()] + esparsos))
+    linhas = linhas[np.diff(linhas, prepend=-1) != 0]
+    if not densos:
+        return linhas
+    return np.bitwise_or(reduce(np.bitwise_or, densos), _denso(linhas, len(densos[0]) * 8))
+
+
+def bitmap(indice, coluna, valores):
+    """Linhas em que `coluna` é um dos `valores` (um valor ou uma lista)."""
+    if isinstance(valores, str) or not np.iterable(valores):
+        valores = [valores]
+    por_valor = indice.bitmaps[coluna]
+    return ou(*(por_valor[v] for v in valores if v in por_valor))
+
+
+def consultar(indice, filtros):
+    """Linhas que atendem a `filtros`, {coluna: valor ou lista}.
+
+    Valores da mesma coluna se juntam com OU; colunas diferentes, com E.
+    Colunas com valor None ou lista vazia não filtram.
+    """
+    conjuntos = [bitmap(indice, coluna, valores) for coluna, valores in filtros.items()
+                 if valores is not None and not (np.iterable(valores) and len(valores) == 0)]
+    return e(*conjuntos) if conjuntos else todas(indice)
+
+
+def posicoes(indice, conjunto):
+    """Posições (em ordem) das linhas do conjunto."""
+    if _esparso(conjunto):
+        return conjunto
+    return np.flatnonzero(np.unpackbits(conjunto, count=len(indice.cubo)))
+
+
+def selecionar(indice, conjunto):
+    """Linhas do cubo que estão no conjunto, na ordem original."""
+    return indice.cubo.iloc[posicoes(indice, conjunto)]
+
+
+def filtrar_bitmaps(indice, convenio=None, exames=None):
+    """Como cubo.filtrar: um convênio e/ou uma lista de exames."""
+    if convenio is None and not exames:
+        return indice.cubo
+    return selecionar(indice, consultar(indice, {'Convênio': convenio,
+                                                 'Descrição': exames}))
@@ -0,0 +1,146 @@
+"""Compactação dos DataFrames mantidos em memória pelos relatórios.
+
+Cada conjunto de dados tem um esquema (coluna -> dtype): texto de baixa
+cardinalidade vira categórico, texto de alta cardinalidade vira string do
+pyarrow (bem menor que objetos Python) e códigos, idades e contagens viram
+inteiros pequenos. Valores em reais continuam float64: em float32 (uns 7
+dígitos) as somas e médias perderiam os centavos. Colunas fora do esquema
+não são alteradas.
+
+Para ver o ganho por coluna:
+
+    python compactacao.py paciente_por_data.xlsx convenio_detalhado_linha.xlsx
+"""
+import argparse
+
+import pandas as pd
+
+ESQUEMA_PACIENTES = {
+    'Código': 'int32',
+    'Paciente': 'string[pyarrow]',
+    'Convênio': 'category',
+    'Exames': 'string[pyarrow]',
+    'Sexo': 'category',
+    'Nome do Usuário': 'category',
+    'Idade': 'Int16',
+    'Arquivo': 'category',
+    'Unidade': 'category',
+    'balde': 'Int16',
+}
+
+ESQUEMA_LINHAS = {
+    'Convênio': 'category',
+    'Descrição': 'category',
+    'Arquivo': 'category',
+    'Unidade': 'category',
+}
+
+ESQUEMA_CUBO = {
+    'Convênio': 'category',
+    'Descrição': 'category',
+    'Quantidade': 'int32',
+    'N_valor': 'int32',
+    'balde': 'Int16',
+}
+
+
+def compactar(df, esquema):
+    """Converte as colunas de `df` presentes em `esquema` para o dtype dele."""
+    for coluna, tipo in esquema.items():
+        if coluna not in df.columns:
+            continue
+        df[coluna] = df[coluna].astype(tipo)
+        if tipo == 'category':
+            # Categorias de linhas removidas (ex.: registros inválidos) sairiam
+            # como colunas/barras vazias nos crosstabs e gráficos
+            df[coluna] = df[coluna].cat.remove_unused_categories()
+    return df
+
+
+def _como_texto(indice, colunas):
+    if indice.name in colunas and isinstance(indice, pd.CategoricalIndex):
+        return indice.astype(object)
+    return indice
+
+
+def sem_categorias(tabela, colunas):
+    """Volta `colunas` (colunas ou níveis do índice) de categórico para texto.
+
+    Usado nos resultados já agregados, que são pequenos, antes de irem para o
+    plotly: ele ordena eixos e legendas de categóricos pela lista de
+    categorias, e não pela ordem em que os valores aparecem, como antes.
+    """
+    tabela = tabela.copy()
+    if isinstance(tabela, pd.DataFrame):
+        for coluna in tabela.columns:
+            if coluna in colunas and isinstance(tabela[coluna].dtype,
+                                                pd.CategoricalDtype):
+                tabela[coluna] = tabela[coluna].astype(object)
+
+    if isinstance(tabela.index, pd.MultiIndex):
+        tabela.index = tabela.index.set_levels(
+            [_como_texto(nivel, colunas) for nivel in tabela.index.levels])
+    else:
+        tabela.index = _como_texto(tabela.index, colunas)
+    return tabela
+
+
+def vista(df):
+    """Cópia rasa de um DataFrame compartilhado, sem copiar os dados.
+
+    Para os DataFrames guardados uma vez e compartilhados entre sessões
+    (st.cache_resource), que as páginas só recebem por meio de uma vista.
+    Com o copy-on-write do pandas (ligado nas páginas), a vista usa os
+    mesmos arrays que `df`; alterar ou criar uma coluna nela, ou escrever
+    com .loc, copia só o que muda, e `df` continua igual para as outras
+    sessões. Colunas derivadas que valem para todas as sessões ficam em
+    caches próprios (ver derivados.py).
+    """
+    return df.copy(deep=False)
+
+
+def relatorio_memoria(antes, depois):
+    """Tabela por coluna com dtype e bytes antes e depois da compactação."""
+    relatorio = pd.DataFrame({
+        'dtype_antes': antes.dtypes.astype(str),
+        'bytes_antes': antes.memory_usage(index=False, deep=True),
+        'dtype_depois': depois.dtypes.astype(str),
+        'bytes_depois': depois.memory_usage(index=False, deep=True),
+    })
+    relatorio.loc['TOTAL', ['bytes_antes', 'bytes_depois']] = relatorio[
+        ['bytes_antes', 'bytes_depois']].sum()
+    relatorio['reducao_%'] = (
+        1 - relatorio['bytes_depois'] / relatorio['bytes_antes']) * 100
+    return relatorio
+
+
+def main(argv=None):
+    from cubo import montar_cubo
+    from exportacoes import ler_exportacoes
+    from ingestao import preparar_linhas
+    from pacientes import carregar_pacientes
+
+    parser = argparse.ArgumentParser(
+        description='Mostra o uso de memória por coluna antes e depois da compactação.')
+    parser.add_argument('pacientes', help='planilha (ou pasta, glob) de pacientes')
+    parser.add_argument('linhas', nargs='?',
+                        help='planilha (ou pasta, glob) de linhas de exame')
+    args = parser.parse_args(argv)
+
+    pd.set_option('display.width', 200)
+    antes = carregar_pacientes(args.pacientes, compacto=False)
+    depois = compactar(antes.copy(), ESQUEMA_PACIENTES)
+    print('Pacientes:')
+    print(relatorio_memoria(antes, depois).to_string(), end='\n\n')
+
+    if args.linhas:
+        linhas, _ = preparar_linhas(ler_exportacoes(args.linhas))
+        antes = montar_cubo(linhas)
+        depois = montar_cubo(compactar(linhas, ESQUEMA_LINHAS))
+        compactar(depois, ESQUEMA_CUBO)
+        print('Cubo do Primeiro relatório:')
+        print(relatorio_memoria(antes, depois).to_string())
+
+
+if __name__ == '__main__':
+    main()
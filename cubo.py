@@ -0,0 +1,119 @@
+"""Cubo de agregados do Primeiro_relatório.
+
+As linhas de exame são agregadas uma vez, na carga, por dia × Convênio ×
+Descrição × balde de 'Valor' (ver quantis.py). Todos os painéis consultam
+o cubo, que tem uma linha por combinação existente em vez de uma linha por
+exame vendido. Com preços de tabela, as linhas de uma combinação dia ×
+Convênio × Descrição quase sempre caem no mesmo balde, e o balde pouco
+aumenta o cubo; em troca, os quantis de 'Valor' saem das células.
+
+Medidas de cada célula:
+    Quantidade  número de linhas (exames)
+    Valor       soma de 'Valor'
+    N_valor     linhas com 'Valor' válido, para calcular médias exatas
+
+As consultas aceitam também a fonte de um motor de consulta (ver
+agregacoes.py), que agrega os cubos mensais do armazém sem carregá-los.
+"""
+import numpy as np
+import pandas as pd
+
+from agregacoes import agrupar, e_pandas
+from bitmaps import IndiceBitmaps, filtrar_bitmaps
+from compactacao import sem_categorias
+from quantis import baldes, quantis
+from topk import contar as contar_por_fatia
+
+CHAVES = ['Data', 'Convênio', 'Descrição']
+MEDIDAS = ['Quantidade', 'Valor', 'N_valor']
+
+
+def montar_cubo(df):
+    """Agrega o DataFrame de linhas em células dia × Convênio × Descrição × balde."""
+    df = df.assign(balde=baldes(df['Valor']))
+    cubo = df.groupby(CHAVES + ['balde'], dropna=False, observed=True).agg(
+        Quantidade=('Valor', 'size'),
+        Valor=('Valor', 'sum'),
+        N_valor=('Valor', 'count')
+    ).reset_index()
+    cubo['ano_mes'] = cubo['Data'].dt.to_period('M').astype('datetime64[ns]')
+    return cubo
+
+
+def filtrar(cubo, convenio=None, exames=None):
+    """Restringe o cubo a um convênio e/ou a uma lista de exames.
+
+    Com o índice de bitmaps.py no lugar do cubo, o filtro sai dos bitmaps,
+    sem comparar as colunas linha a linha.
+    """
+    if isinstance(cubo, IndiceBitmaps):
+        return filtrar_bitmaps(cubo, convenio, exames)
+    if not e_pandas(cubo):
+        return cubo.filtrar(convenio, exames)
+    filtro = pd.Series(True, index=cubo.index)
+    if convenio is not None:
+        filtro &= cubo['Convênio'] == convenio
+    if exames:
+        filtro &= cubo['Descrição'].isin(exames)
+    return cubo[filtro]
+
+
+def somar(cubo, por):
+    """Soma as medidas do cubo agrupando pelas colunas `por`."""
+    if not e_pandas(cubo):
+        return agrupar(cubo, por, {m: (m, 'sum') for m in MEDIDAS})
+    tabela = cubo.groupby(por, observed=True)[MEDIDAS].sum()
+    return sem_categorias(tabela, CHAVES)
+
+
+def cubo_diario(fonte):
+    """Cubo dia × Convênio × Descrição, sem os baldes, agregado pelo motor.
+
+    Para as janelas de tempo (janelas.py) com um motor de consulta: só a
+    tabela agrupada vem para o pandas, não o cubo inteiro.
+    """
+    cubo = agrupar(fonte, CHAVES, {m: (m, 'sum') for m in MEDIDAS}, nulos=True)
+    return sem_categorias(cubo, CHAVES).reset_index()
+
+
+def distintos(cubo, coluna):
+    """Valores distintos de `coluna` (para as listas dos filtros)."""
+    if not e_pandas(cubo):
+        return cubo.distintos(coluna)
+    return cubo[coluna].unique()
+
+
+def contar(cubo, por):
+    """Equivalente a `value_counts()` nas linhas originais."""
+    contagem = somar(cubo, por)['Quantidade']
+    return contagem.sort_values(ascending=False, kind='stable').rename('count')
+
+
+def somar_valor(cubo, por):
+    """Equivalente a `groupby(por)['Valor'].sum()` em ordem decrescente."""
+    return somar(cubo, por)['Valor'].sort_values(ascending=False, kind='stable')
+
+
+def ticket(cubo, por):
+    """Quantidade, valor total e ticket médio por `por`."""
+    tabela = somar(cubo, por)
+    tabela['ticket_medio'] = tabela['Valor'] / tabela['N_valor']
+    return tabela[['Quantidade', 'Valor', 'ticket_medio']]
+
+
+def quantis_valor(cubo, por):
+    """Quantis de 'Valor' (QUANTIS de quantis.py) por `por`, dos esboços das células."""
+    por = [por] if isinstance(por, str) else list(por)
+    return quantis(somar(cubo, por + ['balde'])['N_valor'])
+
+
+def contagens(cubo, por=None):
+    """Quantidade e valor em centavos de cada Descrição, por fatia de `por`.
+
+    Resultado no formato de topk.py, para os rankings de exames.
+    """
+    tabela = somar(cubo, ['Descrição'] + ([por] if por else [])).reset_index()
+    return contar_por_fatia(
+        tabela['Descrição'], tabela[por] if por else None,
+        Quantidade=tabela['Quantidade'].to_numpy('int64'),
+        Centavos=np.rint(tabela['Valor'].fillna(0).to_numpy() * 100).astype('int64'))
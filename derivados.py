@@ -0,0 +1,54 @@
+"""Dados derivados calculados sob demanda, com dependências declaradas.
+
+Cada derivado tem um nome, a lista das dependências (outros derivados ou
+'versao', a versão dos dados) e uma função que recebe os valores das
+dependências na mesma ordem:
+
+    @derivado('resumo_7', 'indice_datas', 'periodo_7')
+    def _(indice, periodo):
+        return resumo(indice, *periodo)
+
+    resumo_7 = obter('resumo_7', versao_dados)
+
+Nada é calculado na declaração: `obter` avalia o derivado (e, antes, as
+dependências) na primeira vez que uma página o pede e guarda o resultado em
+`st.cache_resource` por (nome, versão). Páginas que não pedem um derivado
+não pagam por ele, e os reruns seguintes o leem do cache. Os resultados
+são compartilhados entre sessões, então são somente leitura.
+
+As dependências precisam estar registradas antes do derivado que as usa,
+o que também impede ciclos.
+"""
+import streamlit as st
+
+from medicao import executou, secao
+
+_REGISTRO = {}  # nome -> (dependências, função)
+
+
+def derivado(nome, *dependencias):
+    """Decorador que registra `nome` como derivado de `dependencias`."""
+    faltando = [d for d in dependencias if d != 'versao' and d not in _REGISTRO]
+    if faltando:
+        raise KeyError(f'{nome}: dependências não registradas: {faltando}')
+
+    def registrar(funcao):
+        _REGISTRO[nome] = (dependencias, funcao)
+        return funcao
+    return registrar
+
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def _avaliar(nome, versao):
+    executou()
+    dependencias, funcao = _REGISTRO[nome]
+    return funcao(*(versao if d == 'versao' else obter(d, versao)
+                    for d in dependencias))
+
+
+def obter(nome, versao):
+    """Valor do derivado `nome` para a versão `versao` dos dados."""
+    if nome not in _REGISTRO:
+        raise KeyError(f'derivado desconhecido: {nome}')
+    with secao(f'derivado: {nome}', cache=True):
+        return _avaliar(nome, versao)
@@ -0,0 +1,132 @@
+"""Dimensão dos pacientes: datas, idade, faixa etária, mês e qualidade.
+
+As colunas derivadas de cada exportação são calculadas uma vez, quando o
+arquivo entra (ou muda), e gravadas em Parquet ao lado do snapshot dele
+(`<snapshot>_dimensao.parquet`, ver snapshot.py). As cargas seguintes só
+leem a dimensão e a juntam às linhas, na mesma ordem:
+
+    Data Cad., Data Nasc.   datas já convertidas (dd/mm/aaaa)
+    Idade                   idade exata em anos completos na data do cadastro
+    Faixa_etária            categórica ordenada (códigos inteiros) de FAIXAS
+    ano_mes                 primeiro dia do mês do cadastro
+    Qualidade               'ok' ou a primeira regra de REGRAS que a linha viola
+
+Linhas cuja qualidade está em DESCARTADAS ficam fora dos relatórios.
+
+As faixas podem ser trocadas pela variável CLINICA_FAIXAS, com a idade
+inicial de cada faixa (ex.: '0,12,18,30,60'); os rótulos ficam '0-11',
+'12-17', ..., '60+'. Trocar as faixas refaz as dimensões na próxima carga.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from exportacoes import expandir
+from snapshot import PASTA_SNAPSHOTS, assinatura, caminho_snapshot, nome_snapshot
+
+
+def _faixas(texto):
+    inicios = [int(valor) for valor in texto.split(',')]
+    rotulos = [f'{inicio}-{fim - 1}' for inicio, fim in zip(inicios, inicios[1:])]
+    return list(zip(rotulos + [f'{inicios[-1]}+'], inicios))
+
+
+# (rótulo, idade inicial) de cada faixa; a última vai até IDADE_MAXIMA
+FAIXAS = _faixas(os.environ['CLINICA_FAIXAS']) if 'CLINICA_FAIXAS' in os.environ else [
+    ('0-17', 0), ('18-25', 18), ('26-35', 26), ('36-45', 36), ('46-60', 46), ('60+', 61)]
+LABELS = [rotulo for rotulo, _ in FAIXAS]
+IDADE_MAXIMA = 100
+SEXOS = ['F', 'M']
+
+# Regras de qualidade, na ordem em que são conferidas
+REGRAS = ['sexo inválido', 'sem data de cadastro', 'sem data de nascimento',
+          'nascimento após o cadastro', 'idade acima do máximo']
+DESCARTADAS = ['sexo inválido']
+QUALIDADES = ['ok'] + REGRAS
+
+COLUNAS = ['Data Cad.', 'Data Nasc.', 'Idade', 'Faixa_etária', 'ano_mes', 'Qualidade']
+
+
+def idade_exata(nascimento, cadastro):
+    """Anos completos entre as datas: um a menos se o aniversário não chegou."""
+    def dia(datas):
+        return datas.dt.month * 100 + datas.dt.day
+    return cadastro.dt.year - nascimento.dt.year - (dia(cadastro) < dia(nascimento))
+
+
+def faixa_etaria(idade):
+    """Faixa de FAIXAS de cada idade; fora delas (ou sem idade), nulo."""
+    idade = idade.to_numpy(dtype='float64', na_value=np.nan)
+    inicios = [inicio for _, inicio in FAIXAS]
+    codigos = np.searchsorted(inicios, idade, side='right') - 1
+    codigos[np.isnan(idade) | (idade > IDADE_MAXIMA)] = -1
+    return pd.Categorical.from_codes(codigos, LABELS, ordered=True)
+
+
+def montar_dimensao(df):
+    """Colunas COLUNAS a partir das colunas originais de `df`."""
+    # dd/mm/aaaa: sem dayfirst, o formato seria deduzido do primeiro valor,
+    # e uma exportação que começa em 01/02 viraria mês/dia
+    cadastro = pd.to_datetime(df['Data Cad.'], dayfirst=True, errors='coerce')
+    nascimento = pd.to_datetime(df['Data Nasc.'], dayfirst=True, errors='coerce')
+    idade = idade_exata(nascimento, cadastro)
+
+    violacoes = [df['Sexo'].notna() & ~df['Sexo'].isin(SEXOS),
+                 cadastro.isna(), nascimento.isna(), idade < 0, idade > IDADE_MAXIMA]
+    qualidade = np.select(violacoes, np.arange(1, len(REGRAS) + 1), 0)
+
+    idade = idade.where(idade >= 0).astype('Int16')
+    return pd.DataFrame({
+        'Data Cad.': cadastro,
+        'Data Nasc.': nascimento,
+        'Idade': idade,
+        'Faixa_etária': faixa_etaria(idade),
+        'ano_mes': cadastro.dt.to_period('M').astype('datetime64[ns]'),
+        'Qualidade': pd.Categorical.from_codes(qualidade, QUALIDADES),
+    }, index=df.index)
+
+
+def descrever_descartadas(qualidade):
+    """Mensagem com as linhas descartadas por regra, ou None se não houver."""
+    contagem = qualidade[qualidade.isin(DESCARTADAS)].value_counts()
+    contagem = contagem[contagem > 0]
+    if not len(contagem):
+        return None
+    motivos = ', '.join(f'{regra}: {n}' for regra, n in contagem.items())
+    return f'{contagem.sum()} linha(s) descartada(s) ({motivos})'
+
+
+def _caminhos(arquivo):
+    base = os.path.join(PASTA_SNAPSHOTS, nome_snapshot(arquivo) + '_dimensao')
+    return base + '.parquet', base + '.json'
+
+
+def caminho_dimensao(arquivo):
+    """Parquet da dimensão de `arquivo`, refeito se o snapshot ou as faixas mudaram."""
+    snapshot = caminho_snapshot(arquivo)
+    caminho_parquet, caminho_meta = _caminhos(arquivo)
+    meta = {'snapshot': assinatura(snapshot), 'faixas': [list(faixa) for faixa in FAIXAS],
+            'idade_maxima': IDADE_MAXIMA, 'regras': REGRAS}
+    try:
+        with open(caminho_meta, encoding='utf-8') as arquivo_meta:
+            em_dia = json.load(arquivo_meta) == meta and os.path.exists(caminho_parquet)
+    except (OSError, ValueError):
+        em_dia = False
+
+    if not em_dia:
+        df = pd.read_parquet(snapshot)
+        df.columns = [c.strip() if isinstance(c, str) else c for c in df.columns]
+        temporario = caminho_parquet + '.tmp'
+        montar_dimensao(df).to_parquet(temporario, index=False)
+        os.replace(temporario, caminho_parquet)
+        with open(caminho_meta, 'w', encoding='utf-8') as arquivo_meta:
+            json.dump(meta, arquivo_meta)
+    return caminho_parquet
+
+
+def ler_dimensao(origem):
+    """Dimensão de todos os arquivos de `origem`, alinhada a ler_exportacoes."""
+    partes = [pd.read_parquet(caminho_dimensao(arquivo)) for arquivo in expandir(origem)]
+    return partes[0] if len(partes) == 1 else pd.concat(partes, ignore_index=True)
@@ -0,0 +1,68 @@
+"""Índice de incidência paciente × exame da coluna 'Exames'.
+
+A coluna 'Exames' guarda uma lista separada por vírgulas ('GLI, TGO, HG').
+Ela é quebrada uma única vez em uma tabela longa com uma linha por
+(paciente, exame): 'linha' é a posição do paciente no DataFrame de origem e
+'Exame' é categórico, com as categorias em ordem alfabética. As contagens
+(geral, por sexo, por faixa etária) viram contagens por fatia (ver topk.py)
+sobre os códigos, e os rankings saem delas sem ordenar todos os exames.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from topk import Contagens, top
+
+
+def indexar_exames(exames):
+    """Monta a tabela longa (linha, Exame) a partir da Series 'Exames'."""
+    listas = pc.split_pattern(
+        pa.array(exames, type=pa.string(), from_pandas=True), ',')
+    itens = pc.utf8_trim_whitespace(pc.list_flatten(listas))
+    linhas = pc.list_parent_indices(listas)
+
+    preenchido = pc.not_equal(itens, '')
+    itens = pc.filter(itens, preenchido).dictionary_encode()
+    linhas = pc.filter(linhas, preenchido).to_numpy()
+
+    # Reordena o dicionário (pequeno) em ordem alfabética e remapeia os códigos
+    nomes = itens.dictionary.to_numpy(zero_copy_only=False)
+    ordem = np.argsort(nomes, kind='stable')
+    novo_codigo = np.empty_like(ordem)
+    novo_codigo[ordem] = np.arange(len(ordem))
+    codigos = novo_codigo[itens.indices.to_numpy()]
+
+    return pd.DataFrame({
+        'linha': linhas.astype('int32'),
+        'Exame': pd.Categorical.from_codes(codigos, categories=nomes[ordem])
+    })
+
+
+def contar_exames(indice, k=None):
+    """Os `k` exames mais frequentes (todos, sem `k`), em ordem decrescente."""
+    categorias = indice['Exame'].cat.categories
+    matriz = np.bincount(indice['Exame'].cat.codes.to_numpy(), minlength=len(categorias))
+    contagens = Contagens(pd.Index([None]), pd.Index(categorias), {'Quantidade': matriz[None]})
+    return top(contagens, 'Quantidade', k)
+
+
+def contar_exames_por(indice, grupos, k=None):
+    """Contagem de exames para cada valor de `grupos` (Sexo, Faixa_etária...).
+
+    `grupos` é uma Series alinhada por posição com os pacientes de origem.
+    Devolve um dicionário {grupo: Series em ordem decrescente} com os `k`
+    exames mais frequentes (todos, sem `k`) de cada grupo.
+    """
+    codigos_grupo, valores = pd.factorize(grupos, sort=True)
+    categorias = indice['Exame'].cat.categories
+
+    grupo = codigos_grupo[indice['linha'].to_numpy()]
+    valido = grupo >= 0
+    chave = grupo[valido] * len(categorias) + \
+        indice['Exame'].cat.codes.to_numpy()[valido]
+    matriz = np.bincount(chave, minlength=len(valores) * len(categorias)
+                         ).reshape(len(valores), len(categorias))
+
+    contagens = Contagens(pd.Index(valores), pd.Index(categorias), {'Quantidade': matriz})
+    return {valor: top(contagens, 'Quantidade', k, fatia=valor) for valor in valores}
@@ -0,0 +1,118 @@
+"""Carga de várias exportações do sistema do laboratório de uma vez.
+
+O sistema exporta uma planilha por mês e por unidade. Em vez de um arquivo
+fixo, os carregadores aceitam:
+
+    paciente_por_data.xlsx            um arquivo, como antes
+    exportacoes/pacientes/            uma pasta (as subpastas também)
+    'exportacoes/*/2025-*.xlsx'       um glob
+
+A unidade de cada arquivo é o nome da pasta em que ele está, então a
+organização esperada é `exportacoes/<tipo>/<unidade>/<mês>.xlsx`.
+
+As planilhas que ainda não têm snapshot (ver snapshot.py) são convertidas
+em paralelo, uma por processo: a leitura do xlsx é a etapa cara e não
+libera o GIL, então mais núcleos dão conversão proporcionalmente mais
+rápida. Os Parquet são então lidos e concatenados com as colunas alinhadas
+por nome, e cada linha recebe a procedência em duas colunas categóricas,
+'Arquivo' e 'Unidade'.
+
+Configuração por variáveis de ambiente:
+
+    CLINICA_LINHAS      origem das linhas de exame (Primeiro relatório)
+    CLINICA_PACIENTES   origem dos pacientes (Segundo relatório)
+    CLINICA_PROCESSOS   processos da conversão (padrão: nº de CPUs)
+"""
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from snapshot import assinatura, caminho_snapshot, construir_snapshot, snapshot_valido
+
+PROCESSOS = int(os.environ.get('CLINICA_PROCESSOS', 0)) or None
+EXTENSOES = ('.xlsx',)
+PROCEDENCIA = ['Arquivo', 'Unidade']
+
+
+def multipla(origem):
+    """Indica se `origem` é uma pasta ou um glob, e não um arquivo."""
+    return os.path.isdir(origem) or glob.has_magic(origem)
+
+
+def expandir(origem, extensoes=EXTENSOES):
+    """Arquivos de `origem` (arquivo, pasta ou glob), em ordem alfabética."""
+    if not multipla(origem):
+        return [origem]
+    if os.path.isdir(origem):
+        arquivos = glob.glob(os.path.join(origem, '**', '*'), recursive=True)
+    else:
+        arquivos = glob.glob(origem, recursive=True)
+    # '~$...' são os arquivos de trava do Excel aberto
+    arquivos = sorted(a for a in arquivos if os.path.isfile(a)
+                      and a.lower().endswith(extensoes)
+                      and not os.path.basename(a).startswith('~$'))
+    if not arquivos:
+        raise FileNotFoundError(f'{origem}: nenhuma planilha encontrada')
+    return arquivos
+
+
+def unidade(caminho):
+    """Unidade de um arquivo exportado: o nome da pasta dele."""
+    return os.path.basename(os.path.dirname(os.path.abspath(caminho)))
+
+
+def versao_origem(origem):
+    """Versão dos arquivos de `origem`, para compor chaves de cache.
+
+    Muda quando um arquivo é alterado, incluído ou removido.
+    """
+    return tuple((arquivo, *assinatura(arquivo).values())
+                 for arquivo in expandir(origem))
+
+
+def _converter(origem):
+    # Só grava o snapshot: devolver o DataFrame custaria um pickle à toa
+    construir_snapshot(origem)
+
+
+def snapshots(arquivos, processos=PROCESSOS):
+    """Caminhos Parquet dos `arquivos`, convertendo os que faltam em paralelo."""
+    faltando = [arquivo for arquivo in arquivos if not snapshot_valido(arquivo)]
+    if len(faltando) > 1 and processos != 1:
+        with ProcessPoolExecutor(min(processos or os.cpu_count(), len(faltando))) as pool:
+            list(pool.map(_converter, faltando))
+    else:
+        for arquivo in faltando:
+            _converter(arquivo)
+    return [caminho_snapshot(arquivo) for arquivo in arquivos]
+
+
+def _categorica(valores, tamanhos):
+    # Um valor por arquivo, repetido nas linhas dele
+    categorias, codigos = np.unique(valores, return_inverse=True)
+    return pd.Categorical.from_codes(np.repeat(codigos, tamanhos), categorias)
+
+
+def ler_exportacoes(origem, processos=PROCESSOS):
+    """Substituto de `pd.read_excel` para um arquivo, pasta ou glob.
+
+    Devolve um DataFrame com as linhas de todos os arquivos, na ordem dos
+    arquivos, e as colunas de procedência (PROCEDENCIA). Colunas que faltam
+    em um arquivo ficam vazias nas linhas dele; espaços nas pontas dos
+    cabeçalhos são ignorados.
+    """
+    arquivos = expandir(origem)
+    partes = []
+    for caminho in snapshots(arquivos, processos):
+        parte = pd.read_parquet(caminho)
+        parte.columns = [c.strip() if isinstance(c, str) else c for c in parte.columns]
+        partes.append(parte)
+    df = partes[0] if len(partes) == 1 else pd.concat(partes, ignore_index=True)
+
+    tamanhos = [len(parte) for parte in partes]
+    df['Arquivo'] = _categorica([os.path.relpath(a) for a in arquivos], tamanhos)
+    df['Unidade'] = _categorica([unidade(a) for a in arquivos], tamanhos)
+    return df
@@ -0,0 +1,67 @@
+"""Consulta por faixas de valores (sliders do painel recente).
+
+A tabela por exame (Quantidade, Valor_Total) é indexada uma vez: para cada
+medida guardamos as posições das linhas ordenadas pelo valor. Uma faixa
+[mínimo, máximo] vira duas buscas binárias (`searchsorted`) que delimitam
+um trecho contíguo dessas posições; com duas faixas, o resultado é a
+interseção dos dois trechos, calculada conferindo a outra medida só nas
+linhas do trecho mais curto. Mover um slider não percorre a tabela inteira.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+MEDIDAS = ['Quantidade', 'Valor_Total']
+
+
+class IndiceFaixas(NamedTuple):
+    tabela: pd.DataFrame
+    valores: dict    # medida -> valores na ordem das linhas
+    ordem: dict      # medida -> posições das linhas em ordem crescente
+    ordenados: dict  # medida -> valores da medida em ordem crescente
+
+
+def indexar_faixas(tabela):
+    """Ordena as posições de `tabela` por cada uma das MEDIDAS."""
+    valores, ordem, ordenados = {}, {}, {}
+    for medida in MEDIDAS:
+        valores[medida] = tabela[medida].to_numpy()
+        ordem[medida] = np.argsort(valores[medida], kind='stable')
+        ordenados[medida] = valores[medida][ordem[medida]]
+    return IndiceFaixas(tabela, valores, ordem, ordenados)
+
+
+def limites(indice, medida):
+    """(mínimo, máximo) da medida; (None, None) se a tabela estiver vazia."""
+    valores = indice.ordenados[medida]
+    if len(valores) == 0:
+        return None, None
+    return valores[0], valores[-1]
+
+
+def _posicoes(indice, medida, minimo, maximo):
+    valores = indice.ordenados[medida]
+    i = np.searchsorted(valores, minimo, side='left')
+    j = np.searchsorted(valores, maximo, side='right')
+    return indice.ordem[medida][i:j]
+
+
+def filtrar_faixas(indice, **faixas):
+    """Linhas com cada medida dentro da sua faixa, na ordem original.
+
+    Ex.: filtrar_faixas(indice, Quantidade=(2, 10), Valor_Total=(0, 500.0))
+    """
+    if not faixas:
+        return indice.tabela
+    # Parte do trecho mais curto e só confere as outras medidas nele
+    trechos = sorted(((_posicoes(indice, medida, *faixa), medida)
+                      for medida, faixa in faixas.items()), key=lambda t: len(t[0]))
+    posicoes = trechos[0][0]
+    for _, medida in trechos[1:]:
+        minimo, maximo = faixas[medida]
+        valores = indice.valores[medida][posicoes]
+        posicoes = posicoes[(valores >= minimo) & (valores <= maximo)]
+    if len(posicoes) == len(indice.tabela):
+        return indice.tabela  # faixas cobrem tudo (posição inicial dos sliders)
+    return indice.tabela.iloc[np.sort(posicoes)]
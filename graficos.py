@@ -0,0 +1,97 @@
+"""Redução de pontos das séries longas antes de enviar as figuras ao navegador.
+
+Traços de linha (scatter) com mais de `max_pontos` pontos são reduzidos pelo
+LTTB (Largest-Triangle-Three-Buckets), que mantém o desenho da série (picos
+e vales) com uma fração dos pontos. Opcionalmente, traços longos passam a
+Scattergl (WebGL), que o navegador desenha bem mais rápido que SVG.
+
+Configuração por variáveis de ambiente:
+
+    CLINICA_GRAFICOS_MAX_PONTOS   pontos por traço (padrão 2000; 0 desliga)
+    CLINICA_GRAFICOS_WEBGL        '1' para usar WebGL em traços longos
+
+As séries mensais atuais ficam abaixo do limite e não mudam; as diárias e
+históricos longos passam a ter custo constante no navegador.
+"""
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+
+MAX_PONTOS = int(os.environ.get('CLINICA_GRAFICOS_MAX_PONTOS', 2000))
+WEBGL = os.environ.get('CLINICA_GRAFICOS_WEBGL', '') == '1'
+LIMITE_WEBGL = 1000  # pontos a partir dos quais o traço vai para WebGL
+
+
+def _numerico(valores):
+    valores = np.asarray(valores)
+    if np.issubdtype(valores.dtype, np.datetime64):
+        return valores.astype('datetime64[ns]').astype('int64').astype(float)
+    return valores.astype(float)
+
+
+def lttb(x, y, n):
+    """Posições dos `n` pontos de (x, y) escolhidos pelo LTTB.
+
+    O primeiro e o último ponto são mantidos; os demais são divididos em
+    n - 2 baldes e de cada um fica o ponto que forma o maior triângulo com
+    o ponto escolhido no balde anterior e a média do próximo balde.
+    """
+    tamanho = len(y)
+    if n >= tamanho or n < 3:
+        return np.arange(tamanho)
+    x, y = _numerico(x), _numerico(y)
+
+    passo = (tamanho - 2) / (n - 2)
+    limites = np.append((np.arange(n - 1) * passo).astype(int) + 1, tamanho)
+    escolhidos = np.empty(n, dtype=int)
+    escolhidos[0], escolhidos[-1] = 0, tamanho - 1
+    a = 0
+    for i in range(n - 2):
+        inicio, fim = limites[i], limites[i + 1]
+        proximo = slice(limites[i + 1], limites[i + 2])
+        media_x, media_y = np.nanmean(x[proximo]), np.nanmean(y[proximo])
+        area = np.abs((x[a] - media_x) * (y[inicio:fim] - y[a]) -
+                      (x[a] - x[inicio:fim]) * (media_y - y[a]))
+        a = inicio + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        escolhidos[i + 1] = a
+    return escolhidos
+
+
+def _reduzir_traco(traco, max_pontos):
+    posicoes = lttb(traco.x, traco.y, max_pontos)
+    tamanho = len(traco.x)
+    atualizacao = {}
+    for campo in ['x', 'y', 'text', 'hovertext', 'customdata']:
+        valores = getattr(traco, campo, None)
+        if valores is not None and not isinstance(valores, str) and \
+                len(valores) == tamanho:
+            atualizacao[campo] = np.asarray(valores)[posicoes]
+    traco.update(atualizacao)
+
+
+def reduzir(fig, max_pontos=MAX_PONTOS, webgl=WEBGL):
+    """Aplica LTTB e, se pedido, WebGL aos traços de linha longos de `fig`."""
+    tracos = []
+    for traco in fig.data:
+        if traco.type in ('scatter', 'scattergl') and traco.x is not None:
+            tamanho = len(traco.x)
+            if max_pontos and tamanho > max_pontos:
+                _reduzir_traco(traco, max_pontos)
+            if webgl and traco.type == 'scatter' and tamanho > LIMITE_WEBGL:
+                dados = traco.to_plotly_json()
+                dados.pop('type')
+                traco = go.Scattergl(dados)
+        tracos.append(traco)
+    fig.data = tracos
+    return fig
+
+
+def reduzir_painel(painel, max_pontos=MAX_PONTOS, webgl=WEBGL):
+    """Aplica `reduzir` a todas as figuras de um painel (ver paineis.py)."""
+    for objeto in painel.values():
+        if isinstance(objeto, go.Figure):
+            reduzir(objeto, max_pontos, webgl)
+        elif isinstance(objeto, dict):
+            reduzir_painel(objeto, max_pontos, webgl)
+    return painel
@@ -0,0 +1,293 @@
+"""Ingestão incremental das linhas de exame em um armazém particionado por mês.
+
+A exportação diária gera um arquivo (xlsx ou csv) com as linhas do dia. Em
+vez de reler a planilha completa, cada arquivo é incorporado ao armazém:
+
+    .armazem/linhas/2025-04.parquet   linhas limpas do mês
+    .armazem/cubos/2025-04.parquet    cubo (ver cubo.py) do mês, com os
+                                      baldes dos quantis (quantis.py)
+    .armazem/contagens.parquet        Quantidade e valor por Convênio ×
+                                      Descrição, para os rankings (topk.py)
+    .armazem/manifesto.json           arquivos já ingeridos, versão dos
+                                      dados e do formato
+
+Só as partições (meses) que receberam linhas novas são regravadas, e o
+painel lê apenas os cubos, então o custo de atualização acompanha o
+tamanho do dia novo e não o do histórico. As contagens dos rankings só
+somam as linhas novas.
+
+Os arquivos são lidos em blocos (ver leitura.py) e cada bloco é incorporado
+assim que é lido, então nem a planilha de carga inicial precisa caber
+inteira na memória: o pico fica em um bloco mais a partição do mês. Como
+as exportações, os arquivos vêm em ordem de data, e a numeração abaixo só
+guarda entre blocos as linhas do último dia lido.
+
+Reenvios não duplicam linhas. Linhas idênticas no mesmo dia (mesmo
+Convênio, Descrição e Valor) são numeradas pela ordem de ocorrência. Uma
+linha só entra se o par (linha, ocorrência) ainda não existe. Reenviar um
+dia não muda nada, e reenviar o dia corrigido com linhas a mais acrescenta
+só a diferença.
+
+Uso:
+    python ingestao.py convenio_detalhado_linha.xlsx   # carga inicial
+    python ingestao.py exportacao_2025-05-02.csv       # delta diário
+    python ingestao.py exportacoes/linhas/             # pasta ou glob
+"""
+import argparse
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from compactacao import ESQUEMA_CUBO, ESQUEMA_LINHAS, compactar
+from cubo import montar_cubo
+from exportacoes import expandir, ler_exportacoes, versao_origem
+from leitura import LINHAS_POR_BLOCO, ler_blocos
+from moeda import converter_moeda, descrever_invalidos
+from snapshot import calcular_hash
+from topk import contar, juntar, tabela
+
+PASTA_ARMAZEM = os.environ.get('CLINICA_ARMAZEM', '.armazem')
+# Arquivo, pasta ou glob das exportações (ver exportacoes.py)
+PLANILHA = os.environ.get('CLINICA_LINHAS', 'convenio_detalhado_linha.xlsx')
+
+# Formato dos arquivos do armazém; muda quando eles ganham colunas (2: baldes
+# dos quantis nos cubos). Armazéns de outro formato precisam ser refeitos
+FORMATO = 2
+
+COLUNAS = ['Data', 'Convênio', 'Descrição', 'Valor']
+CHAVE_LINHA = COLUNAS + ['_ocorrencia']
+
+
+def preparar_linhas(df):
+    """Tipa as colunas das linhas de exame e cria 'ano_mes'.
+
+    Retorna (df, invalidos), onde `invalidos` são os valores de 'Valor' que
+    não puderam ser convertidos.
+    """
+    df['Data'] = pd.to_datetime(df['Data'], dayfirst=True)
+    df['Valor'], invalidos = converter_moeda(df['Valor'])
+    df['ano_mes'] = df['Data'].dt.to_period('M').astype('datetime64[ns]')
+    return df, invalidos
+
+
+def _caminho(tipo, mes):
+    return os.path.join(PASTA_ARMAZEM, tipo, f'{mes:%Y-%m}.parquet')
+
+
+def _gravar(df, caminho):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + '.tmp'
+    df.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+
+
+def _manifesto():
+    try:
+        with open(os.path.join(PASTA_ARMAZEM, 'manifesto.json'),
+                  encoding='utf-8') as arquivo:
+            manifesto = json.load(arquivo)
+    except (OSError, ValueError):
+        return {'formato': FORMATO, 'versao': 0, 'arquivos': {}}
+    if manifesto.get('formato', 1) != FORMATO:
+        raise ValueError(f'{PASTA_ARMAZEM} está no formato {manifesto.get("formato", 1)} '
+                         f'(atual: {FORMATO}); apague a pasta e ingira as exportações '
+                         'de novo')
+    return manifesto
+
+
+def _gravar_manifesto(manifesto):
+    caminho = os.path.join(PASTA_ARMAZEM, 'manifesto.json')
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, indent=1, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def versao_armazem():
+    """Versão atual do armazém, ou None se ele ainda não foi criado."""
+    if not os.path.exists(os.path.join(PASTA_ARMAZEM, 'manifesto.json')):
+        return None
+    return _manifesto()['versao']
+
+
+def versao_linhas(planilha=PLANILHA):
+    """Versão das linhas de exame: a do armazém ou, sem ele, a das planilhas."""
+    versao = versao_armazem()
+    return versao_origem(planilha) if versao is None else versao
+
+
+def _contar(df):
+    # Linhas por Convênio × Descrição
+    return contar(df['Descrição'], df['Convênio'], Quantidade=np.ones(len(df), dtype='int64'),
+                  Centavos=np.rint(df['Valor'].fillna(0).to_numpy() * 100).astype('int64'))
+
+
+def contagens_armazem():
+    """Contagens dos rankings (ver topk.py), em fatias por Convênio.
+
+    O arquivo é criado na primeira ingestão com linhas; sem ele, devolve None.
+    """
+    caminho = os.path.join(PASTA_ARMAZEM, 'contagens.parquet')
+    if not os.path.exists(caminho):
+        return None
+    df = pd.read_parquet(caminho)
+    return contar(df['Descrição'], df['Convênio'],
+                  Quantidade=df['Quantidade'].to_numpy(), Centavos=df['Centavos'].to_numpy())
+
+
+def numerar_ocorrencias(linhas):
+    """Número de ocorrência de cada linha entre as linhas idênticas do dia."""
+    chave = pd.util.hash_pandas_object(linhas[COLUNAS], index=False)
+    return chave.groupby(chave.to_numpy()).cumcount().astype('int32')
+
+
+def numerar_bloco(linhas, vistas=None):
+    """Como `numerar_ocorrencias`, continuando a numeração entre blocos.
+
+    `vistas` (Data, _chave, n) conta as linhas dos blocos anteriores do
+    mesmo arquivo, só dos dias ainda abertos. As exportações vêm em ordem de
+    data, então os dias antes do último dia do bloco se fecham e saem de
+    `vistas`; um bloco com um dia já fechado é um erro. Devolve
+    (ocorrencias, vistas).
+    """
+    chave = pd.util.hash_pandas_object(linhas[COLUNAS], index=False).to_numpy()
+    bloco = pd.DataFrame({'Data': linhas['Data'].to_numpy(), '_chave': chave})
+    ocorrencia = bloco.groupby('_chave', sort=False).cumcount().to_numpy('int64')
+    if vistas is None:
+        vistas = bloco.iloc[:0].assign(n=np.int64(0))
+    elif len(vistas) and len(bloco) and bloco['Data'].min() < vistas['Data'].min():
+        raise ValueError(f'linhas de {bloco["Data"].min():%d/%m/%Y} depois das de '
+                         f'{vistas["Data"].min():%d/%m/%Y}: o arquivo não está em '
+                         'ordem de data')
+
+    anteriores = bloco.merge(vistas, on=['Data', '_chave'], how='left')['n']
+    ocorrencia += anteriores.fillna(0).to_numpy('int64')
+
+    contagens = bloco.groupby(['Data', '_chave']).size().rename('n').reset_index()
+    vistas = pd.concat([vistas, contagens], ignore_index=True).groupby(
+        ['Data', '_chave'], as_index=False)['n'].sum()
+    if len(bloco):
+        vistas = vistas[vistas['Data'] >= bloco['Data'].max()]
+    return pd.Series(ocorrencia, index=linhas.index, dtype='int32'), vistas
+
+
+def incorporar(linhas, ocorrencias=None):
+    """Junta `linhas` (já preparadas) ao armazém.
+
+    `ocorrencias` vem de `numerar_bloco` quando as linhas são só parte de
+    um arquivo. Devolve {mês: linhas novas} apenas para as partições
+    alteradas.
+    """
+    linhas = linhas[COLUNAS + ['ano_mes']].copy()
+    if ocorrencias is None:
+        ocorrencias = numerar_ocorrencias(linhas)
+    linhas['_ocorrencia'] = ocorrencias.to_numpy()
+
+    anteriores = contagens_armazem()
+    alteradas, acrescentadas = {}, []
+    for mes, novas in linhas.groupby('ano_mes'):
+        caminho = _caminho('linhas', mes)
+        if os.path.exists(caminho):
+            existentes = pd.read_parquet(caminho)
+            juntas = pd.concat([existentes, novas], ignore_index=True)
+            juntas = juntas.drop_duplicates(subset=CHAVE_LINHA, keep='first')
+        else:
+            existentes, juntas = novas.iloc[:0], novas
+
+        acrescidas = len(juntas) - len(existentes)
+        if acrescidas == 0:
+            continue
+        acrescentadas.append(juntas.iloc[len(existentes):])
+        juntas = juntas.sort_values('Data', kind='stable')
+        _gravar(juntas, caminho)
+        _gravar(montar_cubo(juntas), _caminho('cubos', mes))
+        alteradas[mes] = acrescidas
+
+    if acrescentadas:
+        novas = pd.concat(acrescentadas, ignore_index=True)
+        novas = _contar(novas)
+        atuais = novas if anteriores is None else juntar(anteriores, novas)
+        _gravar(tabela(atuais, 'Convênio', 'Descrição'),
+                os.path.join(PASTA_ARMAZEM, 'contagens.parquet'))
+    return alteradas
+
+
+def ingerir(caminho, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Ingere um arquivo de exportação. Arquivos já ingeridos são ignorados.
+
+    O arquivo é lido e incorporado em blocos de `linhas_por_bloco` linhas.
+    Devolve (alteradas, invalidos) como em `incorporar`/`preparar_linhas`.
+    """
+    manifesto = _manifesto()
+    assinatura = calcular_hash(caminho)
+    if assinatura in manifesto['arquivos']:
+        return {}, pd.Series(dtype=object)
+
+    alteradas, todos_invalidos, vistas = {}, [], None
+    for bloco in ler_blocos(caminho, linhas_por_bloco, colunas=COLUNAS):
+        linhas, invalidos = preparar_linhas(bloco)
+        todos_invalidos.append(invalidos)
+        ocorrencias, vistas = numerar_bloco(linhas, vistas)
+        for mes, n in incorporar(linhas, ocorrencias).items():
+            alteradas[mes] = alteradas.get(mes, 0) + n
+    invalidos = (pd.concat(todos_invalidos) if todos_invalidos
+                 else pd.Series(dtype=object))
+
+    manifesto['arquivos'][assinatura] = os.path.basename(caminho)
+    if alteradas:
+        manifesto['versao'] += 1
+    os.makedirs(PASTA_ARMAZEM, exist_ok=True)
+    _gravar_manifesto(manifesto)
+    return alteradas, invalidos
+
+
+def ler_cubo_armazem():
+    """Cubo completo: concatenação dos cubos mensais."""
+    arquivos = sorted(glob.glob(os.path.join(PASTA_ARMAZEM, 'cubos', '*.parquet')))
+    return pd.concat([pd.read_parquet(a) for a in arquivos], ignore_index=True)
+
+
+def cubo_atual(planilha=PLANILHA, avisar=print):
+    """Cubo compacto usado pelos painéis.
+
+    Vem do armazém quando ele existe; senão, as planilhas de `planilha`
+    (arquivo, pasta ou glob) são agregadas. `avisar` recebe a mensagem sobre
+    valores inválidos.
+    """
+    if versao_armazem() is not None:
+        return compactar(ler_cubo_armazem(), ESQUEMA_CUBO)
+
+    linhas, invalidos = preparar_linhas(ler_exportacoes(planilha))
+    if len(invalidos):
+        avisar(descrever_invalidos('Valor', invalidos))
+    cubo = montar_cubo(compactar(linhas, ESQUEMA_LINHAS))
+    return compactar(cubo, ESQUEMA_CUBO)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Ingere arquivos de exportação no armazém mensal.')
+    parser.add_argument('arquivos', nargs='+',
+                        help='arquivos .xlsx ou .csv, pastas ou globs')
+    parser.add_argument('--linhas-por-bloco', type=int, default=LINHAS_POR_BLOCO,
+                        help='linhas lidas e incorporadas por vez')
+    args = parser.parse_args(argv)
+
+    arquivos = [caminho for origem in args.arquivos
+                for caminho in expandir(origem, extensoes=('.xlsx', '.csv'))]
+    for caminho in arquivos:
+        alteradas, invalidos = ingerir(caminho, args.linhas_por_bloco)
+        if len(invalidos):
+            print(descrever_invalidos('Valor', invalidos))
+        if not alteradas:
+            print(f'{caminho}: nada novo')
+            continue
+        meses = ', '.join(f'{mes:%Y-%m} (+{n})' for mes, n in alteradas.items())
+        print(f'{caminho}: {meses}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""Janelas de tempo (ontem, 7 dias, 30 dias...) sobre o cubo de agregados.
+
+O cubo é ordenado por 'Data' e indexado por dia. Para cada dia guardamos a
+posição em que ele começa no cubo e, por Convênio e por Descrição, somas
+acumuladas de Quantidade e Valor. Assim qualquer janela [inicio, fim] é
+resolvida com buscas binárias (`searchsorted`) e uma subtração das somas
+acumuladas, sem percorrer as linhas do período.
+
+As somas ficam em um de dois formatos:
+
+    denso     matriz (dias + 1) × categorias; para Convênio, com poucas
+              categorias
+    esparso   só os pares (categoria, dia) com exame, em ordem, com a soma
+              acumulada nessa ordem; para Descrição, em que a matriz densa
+              (centenas de exames × todos os dias) tem muitos zeros. Nunca
+              passa de 1,5× a matriz densa, e a janela de cada categoria
+              sai de duas buscas binárias
+
+Os valores são acumulados em centavos (inteiros), então as diferenças entre
+somas acumuladas são exatas.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+DIMENSOES = ['Convênio', 'Descrição']
+DENSAS = ['Convênio']
+
+
+class Acumulado(NamedTuple):
+    chaves: np.ndarray      # esparso: categoria * (dias + 1) + dia, ordenadas;
+                            # denso: None
+    quantidade: np.ndarray  # denso: (dias + 1, categorias); esparso: (pares + 1)
+    centavos: np.ndarray
+
+
+class IndiceDatas(NamedTuple):
+    cubo: pd.DataFrame
+    dias: np.ndarray        # dias com exame, ordenados (datetime64)
+    inicio_dia: np.ndarray  # posição no cubo onde cada dia começa (+ fim)
+    categorias: dict        # dimensão -> pd.Index das categorias
+    acumulados: dict        # dimensão -> Acumulado
+
+
+def _denso(dia, codigo, pesos, n_dias, n_categorias):
+    matriz = np.zeros((n_dias + 1, n_categorias), dtype='int64')
+    np.add.at(matriz, (dia + 1, codigo), pesos)
+    return matriz.cumsum(axis=0)
+
+
+def _acumular(dia, codigo, quantidade, centavos, n_dias, n_categorias, denso):
+    if denso:
+        return Acumulado(None, _denso(dia, codigo, quantidade, n_dias, n_categorias),
+                         _denso(dia, codigo, centavos, n_dias, n_categorias))
+    # Uma posição por (categoria, dia) com exame, em ordem
+    chaves, posicao = np.unique(codigo * (n_dias + 1) + dia, return_inverse=True)
+    acumulados = []
+    for pesos in (quantidade, centavos):
+        soma = np.zeros(len(chaves) + 1, dtype='int64')
+        np.add.at(soma, posicao + 1, pesos)
+        acumulados.append(soma.cumsum())
+    return Acumulado(chaves, *acumulados)
+
+
+def _no_periodo(indice, dimensao, i, j):
+    # (quantidade, centavos) por categoria nos dias [i, j); a última posição
+    # é a das linhas sem categoria
+    acumulado = indice.acumulados[dimensao]
+    if acumulado.chaves is None:
+        return (acumulado.quantidade[j] - acumulado.quantidade[i],
+                acumulado.centavos[j] - acumulado.centavos[i])
+    # Os pares de uma categoria nos dias [i, j) são contíguos nas chaves
+    base = np.arange(len(indice.categorias[dimensao]) + 1) * (len(indice.dias) + 1)
+    de = np.searchsorted(acumulado.chaves, base + i)
+    ate = np.searchsorted(acumulado.chaves, base + j)
+    return (acumulado.quantidade[ate] - acumulado.quantidade[de],
+            acumulado.centavos[ate] - acumulado.centavos[de])
+
+
+def indexar_datas(cubo):
+    """Ordena o cubo por data e monta as somas acumuladas por dimensão."""
+    cubo = cubo[cubo['Data'].notna()].sort_values(
+        'Data', kind='stable').reset_index(drop=True)
+    datas = cubo['Data'].to_numpy()
+    dias = np.unique(datas)
+    inicio_dia = np.append(np.searchsorted(datas, dias), len(cubo))
+    dia = np.searchsorted(dias, datas)
+
+    quantidade = cubo['Quantidade'].to_numpy('int64')
+    centavos = np.rint(cubo['Valor'].fillna(0).to_numpy() * 100).astype('int64')
+
+    categorias, acumulados = {}, {}
+    for dimensao in DIMENSOES:
+        codigo, valores = pd.factorize(cubo[dimensao], sort=True)
+        categorias[dimensao] = pd.Index(valores.astype(object))
+        # Linhas sem categoria (NaN) entram só no total, pela última coluna
+        codigo = np.where(codigo < 0, len(categorias[dimensao]), codigo)
+        acumulados[dimensao] = _acumular(
+            dia, codigo, quantidade, centavos, len(dias),
+            len(categorias[dimensao]) + 1, dimensao in DENSAS)
+
+    return IndiceDatas(cubo, dias, inicio_dia, categorias, acumulados)
+
+
+def data_referencia(indice):
+    """Último dia com exames; é o 'hoje' das janelas móveis."""
+    return pd.Timestamp(indice.dias[-1])
+
+
+def janela(indice, dias, referencia=None):
+    """Intervalo (inicio, fim) dos últimos `dias` dias corridos até a referência."""
+    fim = data_referencia(indice) if referencia is None else pd.Timestamp(referencia)
+    fim = fim.normalize()
+    return fim - pd.Timedelta(days=dias - 1), fim
+
+
+def _limites(indice, inicio, fim):
+    # Dias inteiros: de 00:00 de `inicio` até o fim do dia de `fim`
+    inicio = pd.Timestamp(inicio).normalize()
+    fim = pd.Timestamp(fim).normalize() + pd.Timedelta(days=1)
+    i = np.searchsorted(indice.dias, inicio.to_datetime64(), side='left')
+    j = np.searchsorted(indice.dias, fim.to_datetime64(), side='left')
+    return i, j
+
+
+def resumo(indice, inicio, fim):
+    """Totais do período: exames, valor, dias com exame e média diária."""
+    i, j = _limites(indice, inicio, fim)
+    quantidade, centavos = _no_periodo(indice, DENSAS[0], i, j)
+    quantidade, valor = int(quantidade.sum()), centavos.sum() / 100
+    dias_com_exame = int(j - i)
+    return {
+        'quantidade': quantidade,
+        'valor': valor,
+        'dias': dias_com_exame,
+        'media_diaria': quantidade / dias_com_exame if dias_com_exame else 0.0,
+    }
+
+
+def por_dimensao(indice, dimensao, inicio, fim):
+    """Quantidade e Valor por categoria de `dimensao` no período."""
+    i, j = _limites(indice, inicio, fim)
+    quantidade, centavos = _no_periodo(indice, dimensao, i, j)
+    tabela = pd.DataFrame({
+        'Quantidade': quantidade[:-1],
+        'Valor': centavos[:-1] / 100
+    }, index=indice.categorias[dimensao].rename(dimensao))
+    return tabela[tabela['Quantidade'] > 0]
+
+
+def fatiar(indice, inicio, fim):
+    """Linhas do cubo dentro do período (fatia contígua, sem varredura)."""
+    i, j = _limites(indice, inicio, fim)
+    return indice.cubo.iloc[indice.inicio_dia[i]:indice.inicio_dia[j]]
+
+
+def ranking(tabela, medida):
+    """Coluna `medida` em ordem decrescente, com desempate pelo nome."""
+    return tabela[medida].sort_values(ascending=False, kind='stable')
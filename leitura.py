@@ -0,0 +1,64 @@
+"""Leitura em blocos de planilhas e csv grandes.
+
+`pd.read_excel` monta a planilha inteira (e as células intermediárias do
+openpyxl) antes de devolver o DataFrame, então o pico de memória cresce com
+o arquivo. Aqui as linhas são percorridas no modo somente leitura do
+openpyxl e entregues em DataFrames de até `linhas_por_bloco` linhas, de modo
+que o pico fica limitado pelo tamanho do bloco.
+
+    for bloco in ler_blocos('convenio_detalhado_linha.xlsx', colunas=COLUNAS):
+        ...
+"""
+from itertools import islice
+
+import pandas as pd
+from openpyxl import load_workbook
+
+LINHAS_POR_BLOCO = 50_000
+
+
+def _blocos_excel(caminho, linhas_por_bloco, colunas):
+    livro = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        linhas = livro.active.iter_rows(values_only=True)
+        cabecalho = list(next(linhas, ()))
+        if colunas is None:
+            colunas = [c for c in cabecalho if c is not None]
+        faltando = [c for c in colunas if c not in cabecalho]
+        if faltando:
+            raise ValueError(f'{caminho}: colunas ausentes: {faltando}')
+        posicoes = [cabecalho.index(c) for c in colunas]
+
+        while True:
+            lote = list(islice(linhas, linhas_por_bloco))
+            if not lote:
+                break
+            # Linhas mais curtas que o cabeçalho (células vazias no fim)
+            lote = [linha + (None,) * (len(cabecalho) - len(linha))
+                    for linha in lote]
+            bloco = pd.DataFrame(
+                [[linha[p] for p in posicoes] for linha in lote],
+                columns=colunas)
+            yield bloco.dropna(how='all')
+    finally:
+        livro.close()
+
+
+def _blocos_csv(caminho, linhas_por_bloco, colunas):
+    leitor = pd.read_csv(caminho, sep=None, engine='python', dtype=str,
+                         encoding='utf-8-sig', usecols=colunas,
+                         chunksize=linhas_por_bloco)
+    with leitor:
+        yield from leitor
+
+
+def ler_blocos(caminho, linhas_por_bloco=LINHAS_POR_BLOCO, colunas=None):
+    """Gera DataFrames com até `linhas_por_bloco` linhas do arquivo.
+
+    `colunas` restringe (e ordena) as colunas lidas; as demais nem chegam a
+    virar objetos Python. Aceita .xlsx e .csv.
+    """
+    if caminho.lower().endswith('.csv'):
+        yield from _blocos_csv(caminho, linhas_por_bloco, colunas)
+    else:
+        yield from _blocos_excel(caminho, linhas_por_bloco, colunas)
@@ -0,0 +1,118 @@
+"""Medição do tempo de cada seção dos relatórios.
+
+Desligada por padrão. Para ligar, use a variável de ambiente
+CLINICA_MEDICAO ou o parâmetro `?medicao=` na URL, com um ou mais destinos
+separados por vírgula:
+
+    painel   tabela na barra lateral ao fim da página
+    log      uma linha por seção no logger 'clinica.medicao'
+
+Uso nos scripts:
+
+    iniciar()
+    with secao('carga: cubo', cache=True) as s:
+        cubo = carregar_cubo(versao)
+        s['linhas'] = len(cubo)
+    ...
+    mostrar()
+
+Dentro das funções com `st.cache_*`, `executou()` marca a seção corrente
+como cache miss; seções com `cache=True` que não foram marcadas são hits.
+Desligada, `secao` devolve sempre o mesmo contexto vazio e `executou`
+retorna de imediato.
+"""
+import contextlib
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+DESTINOS = {'painel', 'log'}
+
+logger = logging.getLogger('clinica.medicao')
+
+# Cada execução do script roda em uma thread; o registro é por thread
+_local = threading.local()
+
+
+def _destinos_pedidos():
+    pedido = st.query_params.get('medicao') or os.environ.get('CLINICA_MEDICAO', '')
+    return {d.strip() for d in pedido.split(',')} & DESTINOS
+
+
+def iniciar(destinos=None):
+    """Começa o registro desta execução da página."""
+    _local.destinos = _destinos_pedidos() if destinos is None else set(destinos)
+    _local.secoes = []
+    _local.pilha = []
+    _local.inicio = time.perf_counter()
+
+
+def ativa():
+    return bool(getattr(_local, 'destinos', None))
+
+
+@contextlib.contextmanager
+def _medir(nome, cache):
+    registro = {'secao': nome, 'nivel': len(_local.pilha), 'ms': None,
+                'linhas': None, 'cache': 'hit' if cache else ''}
+    _local.secoes.append(registro)
+    _local.pilha.append(registro)
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro['ms'] = (time.perf_counter() - inicio) * 1000
+        _local.pilha.pop()
+
+
+def secao(nome, cache=False):
+    """Contexto que mede a seção `nome`.
+
+    O dicionário devolvido aceita `linhas` (linhas processadas). Com
+    `cache=True`, a seção mostra se alguma função em cache foi executada.
+    """
+    if not ativa():
+        # Um dicionário novo por chamada: quem escreve nele não afeta as outras
+        return contextlib.nullcontext({})
+    return _medir(nome, cache)
+
+
+def executou():
+    """Chamada no corpo de funções em cache: a chamada atual foi um miss."""
+    if not ativa():
+        return
+    for registro in _local.pilha:
+        if registro['cache']:
+            registro['cache'] = 'miss'
+
+
+def tabela():
+    """Seções medidas nesta execução, com o total ao fim."""
+    total = {'secao': 'TOTAL', 'nivel': 0, 'linhas': None, 'cache': '',
+             'ms': (time.perf_counter() - _local.inicio) * 1000}
+    secoes = pd.DataFrame(_local.secoes + [total],
+                          columns=['secao', 'nivel', 'ms', 'linhas', 'cache'])
+    secoes['secao'] = ['  ' * n + s for n, s in zip(secoes['nivel'], secoes['secao'])]
+    secoes['linhas'] = secoes['linhas'].astype('Int64')
+    return secoes.drop(columns='nivel').set_index('secao')
+
+
+def mostrar():
+    """Envia as medições desta execução aos destinos ligados."""
+    if not ativa():
+        return
+    resultado = tabela()
+    if 'log' in _local.destinos:
+        if not logger.handlers:
+            logger.addHandler(logging.StreamHandler())
+            logger.setLevel(logging.INFO)
+        for secao_, linha in resultado.iterrows():
+            logger.info('%-45s %9.1f ms  linhas=%s  cache=%s', secao_,
+                        linha['ms'], linha['linhas'], linha['cache'] or '-')
+    if 'painel' in _local.destinos:
+        with st.sidebar.expander('Tempo por seção', expanded=True):
+            st.dataframe(resultado.round({'ms': 1}), use_container_width=True)
@@ -0,0 +1,119 @@
+"""Conversão vetorizada de valores monetários no formato brasileiro.
+
+Aceita textos como 'R$\xa01.234,56', 'R$ 54,80', '12,5', '1.234' e '-3,10',
+além de colunas que o Excel já entregou como número. As operações são feitas
+com pyarrow.compute sobre o array de strings inteiro, sem laço em Python.
+
+O caminho inverso, `formatar_reais`, gera os rótulos 'R$1.234.567,89' de um
+array inteiro com operações do numpy, grupo de milhar por grupo de milhar.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Número sem vírgula cujos pontos só podem ser separador de milhar: 1.234.567
+SO_MILHAR = r'^\d{1,3}(\.\d{3})+$'
+NUMERO = r'^\d+(\.\d+)?$'
+
+
+def _numero(texto):
+    texto = pc.utf8_trim(texto, characters='-R$ \xa0')
+
+    tem_virgula = pc.match_substring(texto, ',')
+    sem_milhar = pc.replace_substring(texto, '.', '')
+    if pc.all(tem_virgula).as_py():
+        texto = pc.replace_substring(sem_milhar, ',', '.')
+    else:
+        texto = pc.if_else(
+            tem_virgula,
+            pc.replace_substring(sem_milhar, ',', '.'),
+            pc.if_else(pc.match_substring_regex(texto, SO_MILHAR),
+                       sem_milhar, texto))
+
+    vazio = pc.fill_null(pc.equal(texto, ''), True)
+    try:
+        return pc.cast(pc.if_else(vazio, None, texto), pa.float64()), vazio
+    except pa.ArrowInvalid:
+        # Há textos que não são número: anula só essas linhas
+        valido = pc.match_substring_regex(texto, NUMERO)
+        return pc.cast(pc.if_else(valido, texto, None), pa.float64()), vazio
+
+
+def _texto_para_float(texto):
+    # O sinal pode vir antes ou depois do símbolo: '-R$ 4,40' ou 'R$ -4,40'
+    negativo = pc.match_substring(texto, '-')
+    valores, vazio = _numero(texto)
+    return pc.if_else(negativo, pc.negate(valores), valores), vazio
+
+
+def _para_arrow(serie):
+    try:
+        return pa.array(serie, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Coluna mista (texto e número): converte só o que não é nulo
+        return pa.array(serie.astype(str).where(serie.notna()),
+                        type=pa.string(), from_pandas=True)
+
+
+def converter_moeda(serie):
+    """Converte `serie` para float.
+
+    Retorna a tupla (valores, invalidos): `valores` tem o mesmo índice de
+    `serie`, com NaN onde não foi possível converter; `invalidos` contém os
+    valores originais dessas linhas, para serem reportados.
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype('float64'), serie.iloc[:0]
+
+    resultado, vazio = _texto_para_float(_para_arrow(serie))
+    valores = pd.Series(resultado.to_numpy(zero_copy_only=False),
+                        index=serie.index, dtype='float64')
+
+    falhou = valores.isna().to_numpy() & ~vazio.to_numpy(zero_copy_only=False)
+    return valores, serie[falhou]
+
+
+def descrever_invalidos(coluna, invalidos, limite=5):
+    """Mensagem curta para exibir as linhas que não foram convertidas."""
+    exemplos = ', '.join(
+        f'linha {i}: {v!r}' for i, v in invalidos.head(limite).items())
+    return f'{len(invalidos)} valor(es) inválido(s) em "{coluna}" ({exemplos})'
+
+
+def arredondar(valores, casas=0):
+    """Arredonda `valores` a `casas` decimais, imune ao ruído das somas.
+
+    Somas de centavos em ponto flutuante saem como 1234,4999999 ou
+    1234,5000001 conforme a ordem das parcelas (que muda entre motores e
+    threads); arredondar antes a casas + 6 decimais faz os casos de meio
+    real caírem sempre para o mesmo lado.
+    """
+    return np.round(np.round(valores, casas + 6), casas)
+
+
+def formatar_reais(valores, casas=0, prefixo='R$'):
+    """Textos no padrão brasileiro (R$1.234.567,89) para todos os `valores`.
+
+    Mesmo resultado de f'R${v:,.{casas}f}' com os separadores trocados,
+    exceto que o arredondamento é o de `arredondar` e que valores que
+    arredondam para zero não levam sinal; NaN vira texto vazio.
+    """
+    valores = np.asarray(valores, dtype='float64')
+    nulo = np.isnan(valores)
+    escala = 10 ** casas
+    inteiros, fracao = np.divmod(
+        np.round(arredondar(np.abs(np.where(nulo, 0, valores)), casas) * escala
+                 ).astype('int64'), escala)
+
+    # Pontos de milhar: de trás para frente, um ponto a cada três dígitos
+    texto = pc.utf8_reverse(pc.cast(pa.array(inteiros), pa.string()))
+    texto = pc.utf8_rtrim(pc.replace_substring_regex(texto, r'(\d{3})', r'\1.'),
+                          characters='.')
+    partes = [pa.array(np.where((valores < 0) & ((inteiros > 0) | (fracao > 0)),
+                                prefixo + '-', prefixo)),
+              pc.utf8_reverse(texto)]
+    if casas:
+        partes += [',', pc.utf8_lpad(pc.cast(pa.array(fracao), pa.string()), casas, '0')]
+    texto = pc.binary_join_element_wise(*partes, '')
+    return np.where(nulo, '', texto.to_numpy(zero_copy_only=False))
@@ -0,0 +1,227 @@
+"""Motor de consulta DuckDB para os painéis (CLINICA_MOTOR=duckdb).
+
+Em vez de carregar o histórico em um DataFrame, os painéis consultam os
+arquivos Parquet pelo DuckDB, embutido e sem servidor: só as colunas usadas
+são lidas, a agregação usa todos os núcleos e o que volta para o pandas é
+só a tabela agrupada. A interface das fontes está em agregacoes.py.
+
+Fontes:
+    fonte_cubo()        cubos mensais do armazém (ver ingestao.py); sem
+                        armazém, o cubo montado a partir da planilha
+    fonte_pacientes()   pacientes já preparados (com a dimensão de
+                        dimensao.py), gravados em Parquet uma vez por
+                        versão da planilha e das faixas, em PASTA_SNAPSHOTS
+
+Só a agregação passa para o DuckDB. A preparação continua no pandas: sem
+armazém, o cubo é montado pelo pandas (cubo_atual) e copiado para uma
+tabela do DuckDB, e o Parquet dos pacientes é gravado a partir da carga do
+pandas (carregar_pacientes), uma vez por versão. Nesses momentos o pico de
+memória é o da carga do pandas; depois só a tabela do DuckDB fica em
+memória, e as páginas não carregam os DataFrames (o painel recente usa
+cubo.cubo_diario e o de exames, `contar_exames`). Com o armazém, o cubo é
+lido direto dos Parquet mensais.
+
+Requer o pacote `duckdb` (pip install duckdb). Para conferir que os dois
+motores chegam aos mesmos resultados em todos os painéis:
+
+    python paridade.py duckdb
+"""
+import json
+import os
+
+import duckdb
+import pandas as pd
+
+from dimensao import FAIXAS, IDADE_MAXIMA, LABELS
+from exportacoes import versao_origem
+from ingestao import PASTA_ARMAZEM, PLANILHA, cubo_atual, versao_armazem
+from pacientes import ARQUIVO, CATEGORICAS, carregar_pacientes
+from quantis import ERRO
+from snapshot import PASTA_SNAPSHOTS, nome_snapshot
+
+INTEIROS = ('TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT')
+# Itens da coluna 'Exames' ('GLI, TGO'), sem os espaços das pontas
+EXAME = ("regexp_replace(unnest(string_split(\"Exames\", ',')), '^\\s+|\\s+$', '', 'g') "
+         'AS Exame')
+
+
+def _id(coluna):
+    return '"' + coluna.replace('"', '""') + '"'
+
+
+def _texto(valor):
+    return "'" + valor.replace("'", "''") + "'"
+
+
+class FonteDuckDB:
+    """Tabela consultada pelo DuckDB (interface em agregacoes.py).
+
+    `relacao` é a expressão SQL da tabela (read_parquet(...) ou uma view
+    registrada). `categoricas` são as colunas que o pandas trata como
+    categóricas; `ordens` fixa a ordem das categorias de algumas delas
+    (as demais seguem a ordem alfabética, como em compactacao.py).
+    """
+
+    def __init__(self, conexao, relacao, categoricas=(), ordens=None,
+                 filtros=(), parametros=(), _categorias=None):
+        self.conexao = conexao
+        self.relacao = relacao
+        self.categoricas = set(categoricas)
+        self.ordens = ordens or {}
+        self.filtros = list(filtros)
+        self.parametros = list(parametros)
+        self._categorias = {} if _categorias is None else _categorias
+        self._tipos = None
+
+    def _consultar(self, sql):
+        # Um cursor por consulta: as sessões do Streamlit rodam em threads
+        return self.conexao.cursor().execute(sql, self.parametros).df()
+
+    def _onde(self, extras=()):
+        condicoes = self.filtros + list(extras)
+        return ' WHERE ' + ' AND '.join(condicoes) if condicoes else ''
+
+    def tipos(self):
+        if self._tipos is None:
+            descricao = self.conexao.cursor().execute(
+                f'DESCRIBE SELECT * FROM {self.relacao}').fetchall()
+            self._tipos = {linha[0]: linha[1] for linha in descricao}
+        return self._tipos
+
+    def _expressao(self, coluna, funcao):
+        if funcao == 'count':
+            return 'count(*)'
+        if funcao == 'mean':
+            return f'avg({_id(coluna)})'
+        soma = f'coalesce(sum({_id(coluna)}), 0)'
+        return soma + '::BIGINT' if self.tipos()[coluna] in INTEIROS else soma
+
+    def agrupar(self, por, medidas, nulos=False):
+        expressoes = [_id(c) for c in por] + [
+            f'{self._expressao(coluna, funcao)} AS {_id(nome)}'
+            for nome, (coluna, funcao) in medidas.items()]
+        # Como no pandas, chaves nulas só formam grupo com `nulos`
+        condicoes = () if nulos else (f'{_id(c)} IS NOT NULL' for c in por)
+        tabela = self._consultar(
+            f'SELECT {", ".join(expressoes)} FROM {self.relacao}'
+            f'{self._onde(condicoes)} GROUP BY ALL')
+        for coluna in por:
+            if isinstance(tabela[coluna].dtype, pd.CategoricalDtype):
+                tabela[coluna] = tabela[coluna].astype(object)
+        return tabela
+
+    def categorias(self, coluna):
+        if coluna not in self.categoricas:
+            return None
+        if coluna not in self._categorias:
+            if coluna in self.ordens:
+                tipo = pd.CategoricalDtype(self.ordens[coluna], ordered=True)
+            else:
+                # Categorias da tabela inteira, mesmo em uma fonte filtrada
+                valores = self.conexao.cursor().execute(
+                    f'SELECT DISTINCT {_id(coluna)} FROM {self.relacao} '
+                    f'WHERE {_id(coluna)} IS NOT NULL ORDER BY 1').fetchall()
+                tipo = pd.CategoricalDtype([v[0] for v in valores])
+            self._categorias[coluna] = tipo
+        return self._categorias[coluna]
+
+    def filtrar(self, convenio=None, exames=None):
+        filtros, parametros = list(self.filtros), list(self.parametros)
+        if convenio is not None:
+            filtros.append(f'{_id("Convênio")} = ?')
+            parametros.append(convenio)
+        if exames:
+            filtros.append(f'list_contains(?, {_id("Descrição")})')
+            parametros.append(list(exames))
+        return FonteDuckDB(self.conexao, self.relacao, self.categoricas,
+                           self.ordens, filtros, parametros, self._categorias)
+
+    def contar_exames(self, por=None):
+        """Contagens de exames.contar_exames(_por), pela coluna 'Exames'."""
+        grupo = [] if por is None else [f'{_id(por)}::VARCHAR AS grupo']
+        chaves = ([] if por is None else ['grupo']) + ['Exame']
+        # Um exame por linha, como o índice de exames.py: itens sem espaços
+        # nas pontas e sem vazios; empates em ordem alfabética
+        tabela = self._consultar(
+            f'WITH longo AS (SELECT {", ".join(grupo + [EXAME])} '
+            f'FROM {self.relacao}{self._onde()}) '
+            f'SELECT {", ".join(chaves)}, count(*) AS Quantidade FROM longo '
+            "WHERE Exame <> ''" + ('' if por is None else ' AND grupo IS NOT NULL') +
+            ' GROUP BY ALL ORDER BY Quantidade DESC, Exame')
+
+        def serie(parte):
+            return pd.Series(parte['Quantidade'].to_numpy('int64'),
+                             index=pd.Index(parte['Exame'].to_numpy(object), name='Exame'),
+                             name='Quantidade')
+        if por is None:
+            return serie(tabela)
+        return {grupo: serie(parte) for grupo, parte in tabela.groupby('grupo', sort=False)}
+
+    def distintos(self, coluna):
+        """Valores distintos de `coluna`, em ordem alfabética."""
+        tabela = self._consultar(
+            f'SELECT DISTINCT {_id(coluna)} AS valor FROM {self.relacao}'
+            f'{self._onde()} ORDER BY 1')
+        return tabela['valor'].to_numpy()
+
+    def __len__(self):
+        return int(self._consultar(
+            f'SELECT count(*) AS n FROM {self.relacao}{self._onde()}')['n'].iloc[0])
+
+
+def fonte_cubo(planilha=PLANILHA, avisar=print):
+    """Fonte do cubo: os Parquet mensais do armazém ou, sem ele, a planilha."""
+    conexao = duckdb.connect()
+    arquivos = os.path.join(PASTA_ARMAZEM, 'cubos', '*.parquet')
+    if versao_armazem() is not None:
+        return FonteDuckDB(conexao, f'read_parquet({_texto(arquivos)})')
+    # Views registradas não são vistas pelos cursores; o cubo vira tabela
+    conexao.register('cubo_pandas', cubo_atual(planilha, avisar))
+    conexao.execute('CREATE TABLE cubo AS SELECT * FROM cubo_pandas')
+    conexao.unregister('cubo_pandas')
+    return FonteDuckDB(conexao, 'cubo')
+
+
+def _caminhos_preparados(caminho):
+    base = os.path.join(PASTA_SNAPSHOTS, nome_snapshot(caminho) + '_preparado')
+    return base + '.parquet', base + '.json'
+
+
+def preparar_parquet_pacientes(caminho=ARQUIVO, avisar=print):
+    """Grava (se preciso) os pacientes preparados em Parquet e devolve o caminho.
+
+    Os avisos da preparação ficam nos metadados e são repetidos para
+    `avisar` quando o Parquet já está em dia.
+    """
+    caminho_parquet, caminho_meta = _caminhos_preparados(caminho)
+    versao = {'arquivos': [list(arquivo) for arquivo in versao_origem(caminho)],
+              'faixas': [list(faixa) for faixa in FAIXAS], 'idade_maxima': IDADE_MAXIMA,
+              'erro_quantis': ERRO}
+    try:
+        with open(caminho_meta, encoding='utf-8') as arquivo:
+            meta = json.load(arquivo)
+        em_dia = meta['versao'] == versao and os.path.exists(caminho_parquet)
+    except (OSError, ValueError, KeyError, TypeError):
+        em_dia = False
+
+    if em_dia:
+        for aviso in meta['avisos']:
+            avisar(aviso)
+    else:
+        avisos = []
+        os.makedirs(PASTA_SNAPSHOTS, exist_ok=True)
+        temporario = caminho_parquet + '.tmp'
+        carregar_pacientes(caminho, avisar=avisos.append).to_parquet(temporario, index=False)
+        os.replace(temporario, caminho_parquet)
+        with open(caminho_meta, 'w', encoding='utf-8') as arquivo:
+            json.dump({'versao': versao, 'avisos': avisos}, arquivo)
+        for aviso in avisos:
+            avisar(aviso)
+    return caminho_parquet
+
+
+def fonte_pacientes(caminho=ARQUIVO, avisar=print):
+    """Fonte dos pacientes preparados (ver preparar_parquet_pacientes)."""
+    caminho_parquet = preparar_parquet_pacientes(caminho, avisar)
+    return FonteDuckDB(duckdb.connect(), f'read_parquet({_texto(caminho_parquet)})',
+                       CATEGORICAS, {'Faixa_etária': LABELS})
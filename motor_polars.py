@@ -0,0 +1,325 @@
+"""Motor de consulta Polars para os painéis (CLINICA_MOTOR=polars).
+
+A carga inteira (conversão dos valores em reais, dimensão dos pacientes e
+o cubo) é descrita como um único plano preguiçoso (LazyFrame) sobre os
+Parquet dos snapshots e das dimensões (ver dimensao.py): o otimizador do
+Polars lê só as colunas usadas e executa as etapas em paralelo, sem os DataFrames
+intermediários do pandas. O resultado preparado é materializado uma vez;
+cada painel é outro plano sobre ele (filtro, explode dos exames, group_by)
+e só a tabela agrupada volta para o pandas. A interface das fontes está em
+agregacoes.py.
+
+As regras de conversão são as mesmas de moeda.py, ingestao.preparar_linhas,
+dimensao.montar_dimensao e pacientes.preparar_pacientes; `python paridade.py
+polars` confere que os painéis saem iguais aos do pandas.
+
+Requer o pacote `polars` (pip install polars).
+"""
+import os
+
+import pandas as pd
+import polars as pl
+from pandas.tseries.api import guess_datetime_format
+
+from dimensao import (COLUNAS, DESCARTADAS, FAIXAS, IDADE_MAXIMA, LABELS, REGRAS, SEXOS,
+                      caminho_dimensao, descrever_descartadas)
+from exportacoes import expandir, snapshots, unidade
+from ingestao import PASTA_ARMAZEM, PLANILHA, versao_armazem
+from moeda import NUMERO, SO_MILHAR, descrever_invalidos
+from pacientes import ARQUIVO, CATEGORICAS
+from quantis import baldes
+
+
+def _moeda(coluna, tipo):
+    """(valores, inválido): expressões da conversão de moeda.py."""
+    if tipo.is_numeric():
+        return pl.col(coluna).cast(pl.Float64), pl.lit(False)
+    original = pl.col(coluna).cast(pl.String)
+    texto = original.str.strip_chars('-R$ \xa0')
+    sem_milhar = texto.str.replace_all('.', '', literal=True)
+    numero = (pl.when(texto.str.contains(',', literal=True))
+              .then(sem_milhar.str.replace_all(',', '.', literal=True))
+              .when(texto.str.contains(SO_MILHAR)).then(sem_milhar)
+              .otherwise(texto))
+    vazio = (numero == '').fill_null(True)
+    valores = pl.when(numero.str.contains(NUMERO)).then(
+        numero.cast(pl.Float64, strict=False))
+    # O sinal pode vir antes ou depois do símbolo: '-R$ 4,40' ou 'R$ -4,40'
+    valores = pl.when(original.str.contains('-', literal=True)).then(
+        -valores).otherwise(valores)
+    return valores, valores.is_null() & ~vazio
+
+
+def _data(lf, esquema, coluna, dayfirst=False):
+    """Expressão de `pd.to_datetime(coluna, errors='coerce')`.
+
+    Como o pandas, deduz o formato do texto pelo primeiro valor preenchido.
+    """
+    if esquema[coluna].is_temporal():
+        return pl.col(coluna).cast(pl.Datetime('ns'))
+    primeiro = lf.select(pl.col(coluna).drop_nulls().first()).collect().item()
+    formato = None if primeiro is None else \
+        guess_datetime_format(str(primeiro), dayfirst=dayfirst)
+    return pl.col(coluna).cast(pl.String).str.to_datetime(
+        formato, strict=False, time_unit='ns')
+
+
+def _faixa(idade):
+    # Faixas [início, próximo início), a última até IDADE_MAXIMA inclusive
+    fins = [inicio for _, inicio in FAIXAS[1:]] + [IDADE_MAXIMA + 1]
+    expressao = pl
+    for (rotulo, inicio), fim in zip(FAIXAS, fins):
+        expressao = expressao.when((idade >= inicio) & (idade < fim)).then(pl.lit(rotulo))
+    return expressao
+
+
+def _balde(coluna):
+    # Os mesmos baldes de quantis.py: a conta é a do numpy, por lote
+    return pl.col(coluna).map_batches(
+        lambda valores: pl.from_pandas(pd.Series(baldes(valores.to_numpy()))),
+        return_dtype=pl.Int16).alias('balde')
+
+
+def _ano_mes(data):
+    return data.dt.truncate('1mo')
+
+
+def _dimensao(lf, esquema):
+    """Plano de dimensao.montar_dimensao sobre as colunas originais."""
+    lf = lf.with_columns(**{coluna: _data(lf, esquema, coluna, dayfirst=True)
+                            for coluna in ['Data Cad.', 'Data Nasc.']})
+    cadastro, nascimento = pl.col('Data Cad.'), pl.col('Data Nasc.')
+
+    def dia(datas):
+        return datas.dt.month().cast(pl.Int32) * 100 + datas.dt.day()
+    idade = (cadastro.dt.year() - nascimento.dt.year()
+             - (dia(cadastro) < dia(nascimento)).cast(pl.Int32))
+    sexo = pl.col('Sexo').cast(pl.String)
+    violacoes = [sexo.is_not_null() & ~sexo.is_in(SEXOS), cadastro.is_null(),
+                 nascimento.is_null(), idade < 0, idade > IDADE_MAXIMA]
+    qualidade = pl
+    for regra, violacao in zip(REGRAS, violacoes):
+        qualidade = qualidade.when(violacao).then(pl.lit(regra))
+    return (lf.with_columns(Idade=pl.when(idade >= 0).then(idade).cast(pl.Int16),
+                            ano_mes=_ano_mes(cadastro),
+                            Qualidade=qualidade.otherwise(pl.lit('ok')))
+            .with_columns(Faixa_etária=_faixa(pl.col('Idade'))))
+
+
+def _converter_moedas(lf, colunas):
+    """Converte `colunas`; devolve o plano e os planos das linhas inválidas.
+
+    A conversão é feita uma vez (cache) e compartilhada pelos planos.
+    """
+    esquema = lf.collect_schema()
+    conversoes, textos = {}, {}
+    for coluna in colunas:
+        valores, invalido = _moeda(coluna, esquema[coluna])
+        conversoes[coluna] = valores
+        textos[f'_invalido_{coluna}'] = pl.when(invalido).then(pl.col(coluna))
+    lf = lf.with_row_index('_linha').with_columns(**conversoes, **textos).cache()
+    invalidos = {coluna: lf.select('_linha', pl.col(texto).alias(coluna))
+                 .filter(pl.col(coluna).is_not_null())
+                 for coluna, texto in zip(colunas, textos)}
+    return lf.drop(*textos), invalidos
+
+
+def _materializar(lf, invalidos, avisar, descartadas=None):
+    """Executa o plano principal e os das linhas inválidas de uma vez.
+
+    `descartadas` é o plano opcional da Qualidade das linhas descartadas.
+    """
+    extras = [] if descartadas is None else [descartadas]
+    quadro, *listas = pl.collect_all([lf, *invalidos.values(), *extras])
+    for coluna, lista in zip(invalidos, listas):
+        if len(lista):
+            avisar(descrever_invalidos(coluna, pd.Series(
+                lista[coluna].to_list(), index=lista['_linha'].to_list())))
+    if extras:
+        mensagem = descrever_descartadas(listas[-1]['Qualidade'].to_pandas())
+        if mensagem:
+            avisar(mensagem)
+    return quadro
+
+
+def preparar_pacientes(lf, avisar=print, dimensao=None):
+    """Plano equivalente a pacientes.preparar_pacientes; devolve o DataFrame.
+
+    `dimensao` é o LazyFrame das dimensões gravadas (ver dimensao.py),
+    alinhado às linhas de `lf`; sem ela, a dimensão é calculada no plano.
+    """
+    if dimensao is None:
+        lf = _dimensao(lf, lf.collect_schema())
+    else:
+        dimensao = dimensao.with_columns(pl.col('Faixa_etária', 'Qualidade').cast(pl.String))
+        lf = pl.concat([lf.drop(COLUNAS, strict=False), dimensao], how='horizontal')
+    lf, invalidos = _converter_moedas(lf, ['Valor R$', 'Valor Final'])
+
+    descartada = pl.col('Qualidade').is_in(DESCARTADAS)
+    descartadas = lf.filter(descartada).select('Qualidade')
+    lf = (lf.filter(~descartada)
+          .drop('_linha')
+          .with_columns(_balde('Valor Final')))
+    return _materializar(lf, invalidos, avisar, descartadas)
+
+
+def preparar_cubo(lf, avisar=print):
+    """Plano equivalente a preparar_linhas + montar_cubo; devolve o DataFrame."""
+    data = _data(lf, lf.collect_schema(), 'Data', dayfirst=True)
+    lf, invalidos = _converter_moedas(lf, ['Valor'])
+    lf = (lf.with_columns(_balde('Valor'), Data=data)
+          .group_by(['Data', 'Convênio', 'Descrição', 'balde'])
+          .agg(Quantidade=pl.len().cast(pl.Int32),
+               Valor=pl.col('Valor').sum(),
+               N_valor=pl.col('Valor').count().cast(pl.Int32))
+          .with_columns(ano_mes=_ano_mes(pl.col('Data'))))
+    return _materializar(lf, invalidos, avisar)
+
+
+class FontePolars:
+    """DataFrame do Polars consultado por planos preguiçosos.
+
+    `categoricas` são as colunas que o pandas trata como categóricas;
+    `ordens` fixa a ordem das categorias de algumas delas (as demais seguem
+    a ordem alfabética, como em compactacao.py). `filtros` são expressões
+    aplicadas antes de cada consulta.
+    """
+
+    def __init__(self, quadro, categoricas=(), ordens=None, filtros=(),
+                 _categorias=None):
+        self.quadro = quadro
+        self.categoricas = set(categoricas)
+        self.ordens = ordens or {}
+        self.filtros = list(filtros)
+        self._categorias = {} if _categorias is None else _categorias
+        self._longo = None
+
+    def _plano(self, extras=()):
+        lf = self.quadro.lazy()
+        condicoes = self.filtros + list(extras)
+        return lf.filter(*condicoes) if condicoes else lf
+
+    def _expressao(self, nome, coluna, funcao):
+        if funcao == 'count':
+            return pl.len().alias(nome)
+        valores = pl.col(coluna)
+        return (valores.mean() if funcao == 'mean' else valores.sum()).alias(nome)
+
+    def agrupar(self, por, medidas, nulos=False):
+        # Como no pandas, chaves nulas só formam grupo com `nulos`
+        tabela = (self._plano(() if nulos else (pl.col(c).is_not_null() for c in por))
+                  .group_by(por)
+                  .agg(self._expressao(nome, coluna, funcao)
+                       for nome, (coluna, funcao) in medidas.items())
+                  .collect())
+        return tabela.to_pandas()
+
+    def categorias(self, coluna):
+        if coluna not in self.categoricas:
+            return None
+        if coluna not in self._categorias:
+            if coluna in self.ordens:
+                tipo = pd.CategoricalDtype(self.ordens[coluna], ordered=True)
+            else:
+                # Categorias da tabela inteira, mesmo em uma fonte filtrada
+                tipo = pd.CategoricalDtype(self.quadro[coluna].drop_nulls()
+                                           .unique().sort().to_list())
+            self._categorias[coluna] = tipo
+        return self._categorias[coluna]
+
+    def filtrar(self, convenio=None, exames=None):
+        filtros = list(self.filtros)
+        if convenio is not None:
+            filtros.append(pl.col('Convênio') == convenio)
+        if exames:
+            filtros.append(pl.col('Descrição').is_in(list(exames)))
+        return FontePolars(self.quadro, self.categoricas, self.ordens,
+                           filtros, self._categorias)
+
+    def distintos(self, coluna):
+        """Valores distintos de `coluna`, em ordem alfabética."""
+        return (self._plano().select(pl.col(coluna).unique().sort())
+                .collect()[coluna].to_numpy())
+
+    def __len__(self):
+        return self._plano().select(pl.len()).collect().item()
+
+    def _exames(self):
+        # Tabela longa (linha, Exame), montada na primeira contagem, como o
+        # índice de exames.py; o Exame fica categórico
+        if self._longo is None:
+            exame = pl.col('Exame')
+            self._longo = (self._plano().with_row_index('linha')
+                           .select('linha', Exame=pl.col('Exames').str.split(','))
+                           .explode('Exame')
+                           .with_columns(exame.str.strip_chars())
+                           .filter(exame.is_not_null() & (exame != ''))
+                           .with_columns(exame.cast(pl.Categorical))
+                           .collect())
+        return self._longo
+
+    def contar_exames(self, por=None):
+        """Contagens de exames.contar_exames(_por), pela coluna 'Exames'."""
+        longo = self._exames().lazy()
+        chaves = ['Exame']
+        if por is not None:
+            grupos = self._plano().select(pl.col(por).cast(pl.String)
+                                          .cast(pl.Categorical)).collect()[por]
+            longo = longo.with_columns(pl.lit(grupos).gather(pl.col('linha')).alias(por))
+            longo = longo.filter(pl.col(por).is_not_null())
+            chaves = [por, 'Exame']
+        # Agrupar pelos códigos dos categóricos é bem mais rápido que pelos textos
+        tabela = (longo.group_by(pl.col(c).to_physical().alias(f'_{c}') for c in chaves)
+                  .agg(pl.len().alias('Quantidade'), pl.col(chaves).first().cast(pl.String))
+                  # Empates em ordem alfabética, como no sort estável do pandas
+                  .sort(['Quantidade', 'Exame'], descending=[True, False])
+                  .collect())
+
+        def serie(parte):
+            return pd.Series(parte['Quantidade'].to_numpy().astype('int64'),
+                             index=pd.Index(parte['Exame'].to_list(), name='Exame'),
+                             name='Quantidade')
+        if por is None:
+            return serie(tabela)
+        return {grupo[0]: serie(parte)
+                for grupo, parte in tabela.partition_by(por, as_dict=True,
+                                                        maintain_order=True).items()}
+
+    def __repr__(self):
+        return f'FontePolars({self.quadro.height} linhas, {len(self.filtros)} filtro(s))'
+
+
+def varrer(origem):
+    """LazyFrame das exportações de `origem` (ver exportacoes.ler_exportacoes).
+
+    Os snapshots de cada arquivo são concatenados com as colunas alinhadas
+    por nome, mais as colunas de procedência.
+    """
+    arquivos = expandir(origem)
+    partes = []
+    for arquivo, caminho in zip(arquivos, snapshots(arquivos)):
+        lf = pl.scan_parquet(caminho)
+        lf = lf.rename({c: c.strip() for c in lf.collect_schema().names()})
+        partes.append(lf.with_columns(Arquivo=pl.lit(os.path.relpath(arquivo)),
+                                      Unidade=pl.lit(unidade(arquivo))))
+    return partes[0] if len(partes) == 1 else pl.concat(partes, how='diagonal_relaxed')
+
+
+def fonte_cubo(planilha=PLANILHA, avisar=print):
+    """Fonte do cubo: os Parquet mensais do armazém ou, sem ele, as planilhas."""
+    arquivos = os.path.join(PASTA_ARMAZEM, 'cubos', '*.parquet')
+    if versao_armazem() is not None:
+        quadro = pl.scan_parquet(arquivos).with_columns(
+            pl.col('Data', 'ano_mes').cast(pl.Datetime('ns'))).collect()
+    else:
+        quadro = preparar_cubo(varrer(planilha), avisar)
+    return FontePolars(quadro, ['Convênio', 'Descrição'])
+
+
+def fonte_pacientes(caminho=ARQUIVO, avisar=print):
+    """Fonte dos pacientes preparados pelo plano de preparar_pacientes."""
+    lf = varrer(caminho)
+    dimensao = pl.concat([pl.scan_parquet(caminho_dimensao(arquivo))
+                          for arquivo in expandir(caminho)])
+    quadro = preparar_pacientes(lf, avisar, dimensao)
+    return FontePolars(quadro, CATEGORICAS, {'Faixa_etária': LABELS})
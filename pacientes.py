@@ -0,0 +1,143 @@
+"""Camada de acesso aos dados de pacientes usados pelo Segundo_relatório.
+
+A planilha é lida, limpa e enriquecida com a dimensão dos pacientes (Idade,
+ano_mes, Faixa_etária, Qualidade; ver dimensao.py) uma única vez por versão
+do arquivo. O DataFrame resultante fica em `st.cache_resource`, ou seja, é
+o mesmo objeto para todas as sessões e abas do navegador, sem cópia via
+pickle, e a memória não cresce com o número de sessões. Por isso as páginas
+recebem uma vista dele (ver compactacao.vista): com o copy-on-write, o que
+elas alteram ou acrescentam fica na vista.
+"""
+import os
+
+import streamlit as st
+
+from agregacoes import MOTOR, modulo_motor
+from compactacao import ESQUEMA_PACIENTES, compactar, vista
+from dimensao import (COLUNAS, DESCARTADAS, descrever_descartadas, ler_dimensao,
+                      montar_dimensao)
+from exames import indexar_exames
+from exportacoes import ler_exportacoes, versao_origem
+from medicao import executou
+from moeda import converter_moeda, descrever_invalidos
+from quantis import baldes
+
+# Arquivo, pasta ou glob das exportações (ver exportacoes.py)
+ARQUIVO = os.environ.get('CLINICA_PACIENTES', 'paciente_por_data.xlsx')
+
+# Colunas categóricas do DataFrame carregado (ver compactacao.py)
+CATEGORICAS = [coluna for coluna, tipo in ESQUEMA_PACIENTES.items()
+               if tipo == 'category'] + ['Faixa_etária', 'Qualidade']
+
+
+def preparar_pacientes(df, avisar=st.warning, dimensao=None):
+    """Converte os valores, junta a dimensão e descarta as linhas inválidas.
+
+    'balde' é o balde de 'Valor Final' (ver quantis.py), para os quantis.
+    `dimensao` é a de dimensao.ler_dimensao; sem ela, é montada na hora.
+    `avisar` recebe as mensagens sobre valores inválidos e linhas descartadas.
+    """
+    for coluna in ['Valor R$', 'Valor Final']:
+        df[coluna], invalidos = converter_moeda(df[coluna])
+        if len(invalidos):
+            avisar(descrever_invalidos(coluna, invalidos))
+    df['balde'] = baldes(df['Valor Final'])
+
+    if dimensao is None:
+        dimensao = montar_dimensao(df)
+    df[COLUNAS] = dimensao[COLUNAS].set_axis(df.index)
+
+    mensagem = descrever_descartadas(df['Qualidade'])
+    if mensagem:
+        avisar(mensagem)
+        df.drop(df.index[df['Qualidade'].isin(DESCARTADAS)], inplace=True)
+    return df
+
+
+def carregar_pacientes(caminho=ARQUIVO, compacto=True, avisar=st.warning):
+    """Lê as planilhas e devolve o DataFrame limpo e enriquecido.
+
+    `caminho` é um arquivo, uma pasta ou um glob (ver exportacoes.py). Com
+    `compacto`, aplica ESQUEMA_PACIENTES (ver compactacao.py).
+    """
+    df = preparar_pacientes(ler_exportacoes(caminho), avisar, ler_dimensao(caminho))
+    if compacto:
+        compactar(df, ESQUEMA_PACIENTES)
+    return df
+
+
+@st.cache_resource(show_spinner='Carregando dados dos pacientes...')
+def _pacientes_compartilhados(caminho, versao):
+    # `versao` só entra na chave do cache: arquivo novo, entrada nova. Os
+    # avisos da carga voltam junto com os dados e a página os mostra (ver
+    # avisos_pacientes): um st.warning aqui dentro seria repetido a cada
+    # acerto do cache na mesma execução e sumiria nas seguintes
+    executou()
+    avisos = []
+    return carregar_pacientes(caminho, avisar=avisos.append), avisos
+
+
+def versao_pacientes(caminho=ARQUIVO):
+    """Chave da versão atual dos arquivos, para compor chaves de cache."""
+    return versao_origem(caminho)
+
+
+def obter_pacientes(caminho=ARQUIVO):
+    """Vista (ver compactacao.vista) do DataFrame compartilhado da versão atual."""
+    return vista(_pacientes_compartilhados(caminho, versao_pacientes(caminho))[0])
+
+
+@st.cache_resource(show_spinner=False)
+def _indice_compartilhado(caminho, versao):
+    executou()
+    return indexar_exames(_pacientes_compartilhados(caminho, versao)[0]['Exames'])
+
+
+def obter_indice_exames(caminho=ARQUIVO):
+    """Índice paciente × exame (ver exames.py) da versão atual do arquivo."""
+    return _indice_compartilhado(caminho, versao_pacientes(caminho))
+
+
+@st.cache_resource(show_spinner='Preparando a consulta dos pacientes...')
+def _fonte_compartilhada(caminho, versao):
+    executou()
+    avisos = []
+    return modulo_motor().fonte_pacientes(caminho, avisar=avisos.append), avisos
+
+
+def obter_fonte(caminho=ARQUIVO):
+    """O que os painéis consultam (ver agregacoes.py).
+
+    Com CLINICA_MOTOR=duckdb ou polars, a fonte do motor sobre os
+    pacientes preparados; senão, o DataFrame compartilhado.
+    """
+    if MOTOR != 'pandas':
+        return _fonte_compartilhada(caminho, versao_pacientes(caminho))[0]
+    return obter_pacientes(caminho)
+
+
+def avisos_pacientes(caminho=ARQUIVO):
+    """Avisos da carga da versão atual (valores inválidos, linhas descartadas).
+
+    A página os mostra uma vez por execução, fora dos caches.
+    """
+    compartilhados = _fonte_compartilhada if MOTOR != 'pandas' else _pacientes_compartilhados
+    return compartilhados(caminho, versao_pacientes(caminho))[1]
+
+
+def obter_exames(caminho=ARQUIVO):
+    """Argumentos de paineis.painel_exames: (dados, índice de exames).
+
+    Fontes que contam os exames sozinhas (Polars) dispensam o índice.
+    """
+    fonte = obter_fonte(caminho)
+    if hasattr(fonte, 'contar_exames'):
+        return fonte, None
+    return obter_pacientes(caminho), obter_indice_exames(caminho)
+
+
+def invalidar_pacientes():
+    """Descarta os dados em cache; a próxima chamada relê a planilha."""
+    _pacientes_compartilhados.clear()
+    _indice_compartilhado.clear()
+    _fonte_compartilhada.clear()
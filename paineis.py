@@ -0,0 +1,431 @@
+"""Tabelas e figuras dos painéis, sem dependência do Streamlit.
+
+Cada função `painel_*` recebe os dados já carregados e devolve um dicionário
+{nome: objeto} com os DataFrames, Series e figuras do Plotly da página, na
+ordem em que aparecem. Os scripts do Streamlit só cuidam do layout e dos
+widgets; o `relatorios.py` usa as mesmas funções para gerar os relatórios
+estáticos.
+"""
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from agregacoes import contagem, contagem_exames, cruzar, distribuicao, media, soma
+from compactacao import sem_categorias
+from cubo import contagens, contar, filtrar, quantis_valor, somar, somar_valor, ticket
+from dimensao import LABELS
+from faixas import indexar_faixas
+from janelas import fatiar, por_dimensao, ranking
+from moeda import arredondar, formatar_reais
+from topk import top
+
+
+def itens(painel, prefixo=''):
+    """Pares (nome, objeto) do painel, com os sub-dicionários achatados.
+
+    Um item 'faixas' com uma tabela por faixa vira 'faixas_0-17', etc. Usado
+    pelos relatórios estáticos e pela conferência entre motores.
+    """
+    for nome, objeto in painel.items():
+        if isinstance(objeto, dict):
+            yield from itens(objeto, f'{prefixo}{nome}_')
+        else:
+            yield prefixo + nome, objeto
+
+
+def _sem_eixo_y(fig, xaxis_title='Período'):
+    fig.update_layout(
+        yaxis_title='',
+        xaxis_title=xaxis_title,
+        yaxis=dict(showticklabels=False)  # Remove os valores do eixo Y
+    )
+
+
+def _quantis(tabela, colunas=('Mediana', 'P90')):
+    # Quantis dos esboços (ver quantis.py), em centavos
+    return arredondar(tabela[list(colunas)], 2)
+
+
+def _figura_caixas(tabela, eixo):
+    """Caixas P25-mediana-P75 de cada linha de `tabela`, com bigodes no mínimo e no máximo."""
+    fig = go.Figure(go.Box(
+        x=[str(valor) for valor in tabela.index], q1=tabela['P25'],
+        median=tabela['Mediana'], q3=tabela['P75'],
+        lowerfence=tabela['Mínimo'], upperfence=tabela['Máximo']))
+    fig.update_layout(xaxis_title=eixo, yaxis_title='Valor (R$)')
+    return fig
+
+
+def _figura_quantis_mes(tabela):
+    fig = px.line(_quantis(tabela).reset_index(), x='ano_mes',
+                  y=['Mediana', 'P90'], markers=True)
+    fig.update_layout(xaxis_title='Período', yaxis_title='Valor (R$)',
+                      legend_title_text='')
+    return fig
+
+
+# Primeiro_relatório: painel de acompanhamento recente
+
+
+def painel_recente(indice, inicio, fim, convenio=None):
+    """Top exames e convênios do período [inicio, fim] (ver janelas.py).
+
+    Sem `convenio`, traz também a lista e a tabela dos convênios do período;
+    com ele, os totais do convênio. 'mesclado' junta quantidade e valor por
+    exame; 'faixas' é o índice dele para o filtro por faixas de valores.
+    """
+    if convenio is None:
+        por_convenio = por_dimensao(indice, 'Convênio', inicio, fim)
+        por_exame = por_dimensao(indice, 'Descrição', inicio, fim)
+        mais_vendidos_qtde = ranking(por_exame, 'Quantidade').rename('count')
+        mais_vendidos_valor = ranking(por_exame, 'Valor')
+
+        convenios_valor = ranking(por_convenio, 'Valor')
+        painel = {
+            'convenios': list(por_convenio.index),
+            'df_convenios': pd.DataFrame({
+                'Convênio': convenios_valor.index,
+                'Valor Total (R$)': convenios_valor.values,
+                'Quantidade': por_convenio.loc[convenios_valor.index,
+                                               'Quantidade'].to_numpy()
+            }),
+        }
+    else:
+        periodo = fatiar(indice, inicio, fim)
+        filtro = periodo[periodo['Convênio'] == convenio]
+        mais_vendidos_qtde = contar(filtro, 'Descrição')
+        mais_vendidos_valor = somar_valor(filtro, 'Descrição')
+        painel = {
+            'valor_total': filtro['Valor'].sum(),
+            'qtde_total': int(filtro['Quantidade'].sum()),
+        }
+
+    # Criar o dataframe mesclado com nomes de colunas corretos
+    qtde_df = mais_vendidos_qtde.reset_index()
+    qtde_df.columns = ['Descrição', 'Quantidade']
+    valor_df = mais_vendidos_valor.reset_index()
+    valor_df.columns = ['Descrição', 'Valor_Total']
+    mesclado = pd.merge(qtde_df, valor_df, on='Descrição', how='outer')
+    mesclado = mesclado.fillna(0)  # Preencher NaN com 0
+
+    painel.update({
+        'mais_vendidos_qtde': mais_vendidos_qtde,
+        'mais_vendidos_valor': mais_vendidos_valor,
+        'mesclado': mesclado,
+        'faixas': indexar_faixas(mesclado),
+    })
+    return painel
+
+
+# Primeiro_relatório: painel de acompanhamento geral
+
+
+def painel_tipo_exame(cubo, contagens_exames=None):
+    """Análise por tipo de exame.
+
+    Os dois top 10 saem de `contagens_exames` (ver topk.py), as mantidas
+    pelo armazém quando ele existe; sem elas, as do próprio cubo. Mediana e
+    P90 de cada exame saem dos baldes do cubo (ver quantis.py).
+    """
+    ticket_exame = ticket(cubo, 'Descrição').rename(
+        columns={'Quantidade': 'quantidade_vendida'})
+
+    # Valores seguem numéricos (ordenáveis); o formato em reais é da exibição
+    ticket_exame['Valor'] = arredondar(ticket_exame['Valor'])
+    ticket_exame['ticket_medio'] = arredondar(ticket_exame['ticket_medio'], 2)
+    # Ordena pelo valor arredondado, com desempate pelo nome: médias que só
+    # diferem no último bit (entre motores) não trocam de posição
+    ticket_exame = ticket_exame.sort_values(
+        by=['ticket_medio', 'Descrição'], ascending=[False, True], kind='stable')
+
+    if contagens_exames is None:
+        contagens_exames = contagens(cubo)
+    mais_valiosos = (top(contagens_exames, 'Centavos', 10, nome='Descrição') / 100
+                     ).rename('Valor').reset_index()
+    mais_frequentes = top(contagens_exames, 'Quantidade', 10, nome='Descrição'
+                          ).rename('count').reset_index()
+
+    # Aplicar formatação brasileira
+    mais_valiosos_formatado = mais_valiosos.copy()
+    mais_valiosos_formatado['Valor_Formatado'] = formatar_reais(
+        mais_valiosos_formatado['Valor'])
+
+    fig_valor = px.bar(mais_valiosos_formatado, x='Valor',
+                       y='Descrição', text='Valor_Formatado')
+    fig_valor.update_traces(
+        textposition='inside',
+        textfont=dict(size=12, color='white')
+    )
+    fig_valor.update_layout(xaxis_title='Valor (R$)')
+
+    fig_qtde = px.bar(mais_frequentes, x='count',
+                      y='Descrição', text='count')
+    fig_qtde.update_traces(
+        textposition='inside',
+        texttemplate='%{text}',
+        textfont=dict(size=12, color='white')
+    )
+    fig_qtde.update_layout(xaxis_title='Quantidade')
+
+    quantis_exame = _quantis(quantis_valor(cubo, 'Descrição')).sort_values(
+        by=['Mediana', 'Descrição'], ascending=[False, True], kind='stable')
+
+    return {
+        'ticket_exame': ticket_exame,
+        'quantis_exame': quantis_exame,
+        'mais_valiosos': fig_valor,
+        'mais_frequentes': fig_qtde,
+    }
+
+
+def media_diaria_mensal(cubo):
+    """Figura do número médio de exames por dia em cada mês."""
+    media_diaria_por_mes = somar(cubo, ['ano_mes', 'Data'])[
+        'Quantidade'].groupby('ano_mes').mean().reset_index()
+    media_diaria_por_mes.columns = ['ano_mes', 'Média Diária']
+
+    fig = px.bar(media_diaria_por_mes, x='ano_mes',
+                 y='Média Diária', text='Média Diária')
+    fig.update_traces(
+        textposition='outside',
+        texttemplate='%{text:.1f}',
+        textfont=dict(size=12, color='white')
+    )
+    fig.update_layout(
+        xaxis_title='Período',
+        yaxis_title='Média de Exames por Dia'
+    )
+    return fig
+
+
+def quantis_mensais(cubo):
+    """Figura da mediana e do P90 do valor dos exames em cada mês."""
+    return _figura_quantis_mes(quantis_valor(cubo, 'ano_mes'))
+
+
+def evolucao_mensal(cubo, convenio=None, exames=(), por_quantidade=False):
+    """Figura da evolução mensal por valor (ou número) de exames.
+
+    `cubo` pode ser também o índice de bitmaps.py, que resolve os filtros.
+    """
+    exames = list(exames)
+    data = filtrar(cubo, convenio, exames)
+    agrupamento = ['ano_mes'] if exames == [] else ['ano_mes', 'Descrição']
+    visualização = somar(data, agrupamento).reset_index()
+    cor = None if exames == [] else 'Descrição'
+
+    if por_quantidade:
+        fig = px.bar(visualização, x='ano_mes', y='Quantidade',
+                     text='Quantidade', color=cor)
+        fig.update_traces(
+            textposition='outside',
+            texttemplate='%{text}',
+            textfont=dict(size=12, color='white')
+        )
+        fig.update_layout(yaxis_title='Quantidade')
+        return fig
+
+    visualização['Valor_Formatado'] = formatar_reais(visualização['Valor'])
+    fig = px.bar(visualização, x='ano_mes', y='Valor',
+                 text='Valor_Formatado', color=cor)
+    fig.update_traces(
+        textposition='outside',
+        textfont=dict(size=12, color='white')
+    )
+    fig.update_layout(yaxis_title='Valor (R$)')
+    return fig
+
+
+def painel_temporal(cubo):
+    """Análise temporal, sem filtros (todos os convênios e exames)."""
+    return {
+        'media_diaria_por_mes': media_diaria_mensal(cubo),
+        'quantis_mes': quantis_mensais(cubo),
+        'evolucao_valor': evolucao_mensal(cubo),
+        'evolucao_quantidade': evolucao_mensal(cubo, por_quantidade=True),
+    }
+
+
+def _figura_proporcao(proporcao, medida):
+    fig = px.bar(proporcao, x='ano_mes',
+                 y=medida, color='Convênio', text=medida)
+    fig.update_traces(
+        textposition='inside',
+        textfont=dict(size=10, color='white', family='Arial'),
+        texttemplate='%{text:.1f}%',
+        textangle=0
+    )
+    fig.update_layout(
+        xaxis_title='Período',
+        yaxis_title='Porcentagem (%)',
+        showlegend=True
+    )
+    return fig
+
+
+def painel_convenio(cubo):
+    """Análise por Convênio."""
+    ticket_conv = ticket(cubo, 'Convênio').rename(
+        columns={'ticket_medio': 'Ticket_médio'})
+
+    # Valores seguem numéricos (ordenáveis); o formato em reais é da exibição
+    ticket_conv['Valor'] = arredondar(ticket_conv['Valor'])
+    ticket_conv['Ticket_médio'] = arredondar(ticket_conv['Ticket_médio'], 2)
+    ticket_conv = ticket_conv.sort_values(
+        by=['Ticket_médio', 'Convênio'], ascending=[False, True], kind='stable')
+
+    por_mes_convenio = somar(cubo, ['ano_mes', 'Convênio'])
+    por_mes = somar(cubo, 'ano_mes')
+
+    proporção_valor = (por_mes_convenio['Valor']/por_mes['Valor'])*100
+
+    proporção_qtde = (por_mes_convenio['Quantidade'] /
+                      por_mes['Quantidade'])*100
+    proporção_qtde = proporção_qtde.reset_index().sort_values(
+        by=['ano_mes', 'Quantidade'], ascending=[True, False], kind='stable')
+
+    # Na ordem do ticket médio; convênios sem valor válido não têm quantis
+    quantis_conv = quantis_valor(cubo, 'Convênio').reindex(ticket_conv.index).dropna()
+
+    return {
+        'ticket_convenio': ticket_conv,
+        'quantis_convenio': _quantis(quantis_conv, ['P25', 'Mediana', 'P75', 'P90']),
+        'caixas_convenio': _figura_caixas(quantis_conv, 'Convênio'),
+        'proporcao_valor': _figura_proporcao(proporção_valor.reset_index(), 'Valor'),
+        'proporcao_quantidade': _figura_proporcao(proporção_qtde, 'Quantidade'),
+    }
+
+
+# Segundo_relatório
+
+
+def painel_visao_geral(dados):
+    """Visão geral: sexo, faixas etárias, ticket médio e quantis por mês."""
+    conta_simples = media(dados, ['ano_mes'], 'Valor Final')
+    fig = px.bar(conta_simples, x=conta_simples.index,
+                 y=conta_simples.values, text=conta_simples.values)
+    _sem_eixo_y(fig)
+    fig.update_traces(
+        texttemplate='%{text:.1f}'
+    )
+    return {
+        'contagem_sexo': contagem(dados, 'Sexo'),
+        'porcentagem_sexo': contagem(dados, 'Sexo', normalizar=True)*100,
+        'contagem_faixa': contagem(dados, 'Faixa_etária'),
+        'porcentagem_faixa': contagem(dados, 'Faixa_etária', normalizar=True)*100,
+        'ticket_medio_mes': fig,
+        'quantis_mes': _figura_quantis_mes(distribuicao(dados, 'ano_mes')),
+    }
+
+
+def painel_exames(dados, indice_exames):
+    """Exames mais frequentes: geral, por sexo e por faixa etária."""
+    por_sexo = contagem_exames(dados, indice_exames, 'Sexo', k=10)
+    por_faixa = contagem_exames(dados, indice_exames, 'Faixa_etária', k=5)
+
+    faixas = {}
+    for faixa in LABELS:
+        exames_frequentes = por_faixa.get(
+            faixa, pd.Series(name='Quantidade', dtype='int64'))
+        faixas[faixa] = exames_frequentes.to_frame()
+
+    return {
+        'exames_gerais': contagem_exames(dados, indice_exames, k=10).to_frame(),
+        'feminino': por_sexo['F'].to_frame(),
+        'masculino': por_sexo['M'].to_frame(),
+        'faixas': faixas,
+    }
+
+
+def painel_convenios(dados):
+    """Ticket médio e participação no valor por convênio e mês."""
+    conta_complexa = media(dados, ['ano_mes', 'Convênio'],
+                           'Valor Final').reset_index()
+    conta_complexa = sem_categorias(conta_complexa, ['Convênio'])
+    fig_ticket = px.bar(conta_complexa, x='ano_mes',
+                        y='Valor Final', text='Valor Final', color='Convênio')
+    _sem_eixo_y(fig_ticket)
+    fig_ticket.update_traces(
+        texttemplate='%{text:.1f}'
+    )
+
+    valor_conv = soma(dados, ['ano_mes', 'Convênio'],
+                      'Valor Final').reset_index().set_index('ano_mes')
+    valor_conv = sem_categorias(valor_conv, ['Convênio'])
+    valor_mensal = soma(dados, 'ano_mes',
+                        'Valor Final').reset_index().set_index('ano_mes')
+
+    valor_conv['Porcentagem'] = (valor_conv['Valor Final'].div(
+        valor_mensal['Valor Final'], axis=0)*100)
+    valor_conv['Porcentagem'] = [
+        f'{v:.1f}%' for v in valor_conv['Porcentagem']]
+
+    fig_proporcao = px.bar(valor_conv, x=valor_conv.index,
+                           y='Porcentagem', color='Convênio', text_auto=True)
+    return {
+        'ticket_medio_mes': fig_ticket,
+        'proporcao_valor': fig_proporcao,
+    }
+
+
+def painel_sexo(dados):
+    """Ticket médio e quantis por sexo, por convênio e evolução mensal."""
+    ticket_medio = media(dados, 'Sexo', 'Valor Final').to_frame('ticket_medio')
+
+    ticket_medio_conv = cruzar(dados, 'Convênio', 'Sexo', 'Valor Final').fillna(
+        0).sort_values(by='F', ascending=False).reset_index()
+    ticket_medio_conv = sem_categorias(ticket_medio_conv, ['Convênio'])
+    fig_conv = px.bar(ticket_medio_conv, x='Convênio',
+                      y=['F', 'M'], text_auto='.2f')
+    _sem_eixo_y(fig_conv)
+
+    sexo_valor = soma(dados, ['ano_mes', 'Sexo'], 'Valor Final').reset_index()
+    sexo_valor = sem_categorias(sexo_valor, ['Sexo'])
+    fig_evolucao = px.line(sexo_valor, x='ano_mes', y='Valor Final', color='Sexo')
+
+    quantis_sexo = distribuicao(dados, 'Sexo')
+
+    return {
+        'ticket_medio': ticket_medio,
+        'quantis_sexo': _quantis(quantis_sexo, ['P25', 'Mediana', 'P75', 'P90']),
+        'caixas_sexo': _figura_caixas(quantis_sexo, 'Sexo'),
+        'ticket_medio_convenio': fig_conv,
+        'evolucao_valor': fig_evolucao,
+    }
+
+
+def painel_faixa_idade(dados):
+    """Ticket médio e evolução por faixa etária."""
+    ticket_medio_idade = media(dados, 'Faixa_etária', 'Valor Final',
+                               observado=False).to_frame('ticket_medio').reset_index()
+    fig_ticket = px.bar(ticket_medio_idade, x='Faixa_etária',
+                        y='ticket_medio', text='ticket_medio')
+    _sem_eixo_y(fig_ticket)
+    fig_ticket.update_traces(
+        texttemplate='%{text:.2f}'
+    )
+
+    ticket_medio_conv_idade = cruzar(
+        dados, 'Convênio', 'Faixa_etária', 'Valor Final').fillna(0)
+    ticket_medio_conv_idade = sem_categorias(
+        ticket_medio_conv_idade, ['Convênio'])
+    fig_conv = px.bar(ticket_medio_conv_idade, x=ticket_medio_conv_idade.index,
+                      y=ticket_medio_conv_idade.columns, text_auto='.2f')
+    _sem_eixo_y(fig_conv)
+
+    faixa_por_sexo = cruzar(dados, 'Faixa_etária', 'Sexo')
+    fig_sexo = px.bar(faixa_por_sexo, x=faixa_por_sexo.index,
+                      y=faixa_por_sexo.columns, text_auto=True)
+    _sem_eixo_y(fig_sexo)
+
+    grupo_faixa = soma(dados, ['ano_mes', 'Faixa_etária'], 'Valor Final',
+                       observado=False).reset_index()
+    fig_evolucao = px.line(grupo_faixa, x='ano_mes',
+                           y='Valor Final', color='Faixa_etária')
+
+    return {
+        'ticket_medio_faixa': fig_ticket,
+        'ticket_medio_convenio_faixa': fig_conv,
+        'faixa_por_sexo': fig_sexo,
+        'evolucao_valor': fig_evolucao,
+    }
@@ -0,0 +1,118 @@
+"""Confere que os motores de consulta chegam aos mesmos painéis do pandas.
+
+Cada painel de relatorios.PAINEIS é calculado com o pandas e com a fonte
+de cada motor pedido (ver agregacoes.py); tabelas são comparadas com
+tolerância relativa de 1e-5 e figuras traço a traço (nomes, x, y e
+textos). O painel de exames só entra para motores cujas fontes contam os
+exames (contar_exames); os demais usam o índice do pandas nele.
+
+    python paridade.py duckdb polars
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from plotly.graph_objects import Figure
+
+from agregacoes import MOTORES, modulo_motor
+from ingestao import PLANILHA, cubo_atual
+from pacientes import ARQUIVO, carregar_pacientes
+from paineis import itens
+
+
+def _iguais(a, b):
+    a, b = np.asarray(a), np.asarray(b)
+    if a.shape != b.shape:
+        return False
+    if a.dtype.kind in 'fiu' and b.dtype.kind in 'fiu':
+        return np.allclose(a, b, rtol=1e-5, equal_nan=True)
+    return (a.astype(str) == b.astype(str)).all()
+
+
+def diferenca(a, b):
+    """Descrição da diferença entre dois itens de painel, ou None."""
+    if isinstance(a, Figure):
+        tracos_a, tracos_b = a.data, b.data
+        if len(tracos_a) != len(tracos_b):
+            return f'{len(tracos_a)} traços contra {len(tracos_b)}'
+        for traco_a, traco_b in zip(tracos_a, tracos_b):
+            for campo in ['name', 'x', 'y', 'text']:
+                valor_a, valor_b = getattr(traco_a, campo), getattr(traco_b, campo)
+                if (valor_a is None) != (valor_b is None) or \
+                        valor_a is not None and not _iguais(valor_a, valor_b):
+                    return f'traço {traco_a.name!r}: campo {campo}'
+        return None
+    try:
+        testar = pd.testing.assert_series_equal if isinstance(a, pd.Series) \
+            else pd.testing.assert_frame_equal
+        testar(a, b, check_dtype=False, check_index_type=False,
+               check_categorical=False, check_names=False, rtol=1e-5)
+    except AssertionError as erro:
+        return str(erro).splitlines()[0]
+    return None
+
+
+def _calcular(funcao, entrada, dados):
+    inicio = time.perf_counter()
+    if entrada == 'exames':
+        painel = funcao(dados['pacientes'], dados.get('exames'))
+    else:
+        painel = funcao(dados[entrada])
+    return dict(itens(painel)), (time.perf_counter() - inicio) * 1000
+
+
+def paridade(motores, planilha=PLANILHA, pacientes=ARQUIVO):
+    """Compara os painéis de cada motor de `motores` com os do pandas.
+
+    Imprime os tempos de cada painel e devolve a lista de diferenças (vazia
+    se tudo bate).
+    """
+    from exames import indexar_exames
+    from relatorios import PAINEIS
+
+    pandas = {'cubo': cubo_atual(planilha),
+              'pacientes': carregar_pacientes(pacientes, avisar=print)}
+    pandas['exames'] = indexar_exames(pandas['pacientes']['Exames'])
+    dados = {'pandas': pandas}
+    for motor in motores:
+        modulo = modulo_motor(motor)
+        dados[motor] = {'cubo': modulo.fonte_cubo(planilha),
+                        'pacientes': modulo.fonte_pacientes(pacientes)}
+
+    diferencas = []
+    for nome, (entrada, funcao, _) in PAINEIS.items():
+        referencia, tempo = _calcular(funcao, entrada, pandas)
+        tempos = [f'pandas {tempo:8.1f} ms']
+        for motor in motores:
+            if entrada == 'exames' and \
+                    not hasattr(dados[motor]['pacientes'], 'contar_exames'):
+                continue
+            resultado, tempo = _calcular(funcao, entrada, dados[motor])
+            tempos.append(f'{motor} {tempo:8.1f} ms')
+            for item, objeto in referencia.items():
+                texto = diferenca(objeto, resultado[item])
+                if texto:
+                    diferencas.append(f'{motor}: {nome}/{item}: {texto}')
+        print(f'{nome:<20} ' + '   '.join(tempos))
+    return diferencas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Compara os painéis dos motores de consulta com os do pandas.')
+    parser.add_argument('motores', nargs='+', choices=MOTORES[1:])
+    parser.add_argument('--planilha', default=PLANILHA)
+    parser.add_argument('--pacientes', default=ARQUIVO)
+    args = parser.parse_args(argv)
+
+    diferencas = paridade(args.motores, args.planilha, args.pacientes)
+    for texto in diferencas:
+        print('DIFERENTE', texto)
+    print('paridade ok' if not diferencas else f'{len(diferencas)} diferença(s)')
+    return 1 if diferencas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Quantis (mediana, P90...) de valores a partir de esboços mescláveis.
+
+Cada valor é trocado pelo número do seu balde em uma escala logarítmica,
+como no DDSketch: o balde k > 0 cobre (MINIMO·γ^(k-2), MINIMO·γ^(k-1)],
+com γ = (1 + ERRO) / (1 - ERRO), e o representante do balde fica a no
+máximo ERRO (0,5%) de qualquer valor dentro dele. Zero fica no balde 0 e
+os negativos nos baldes -k, então a ordem dos baldes é a dos valores.
+
+O esboço de um grupo é só quantos valores caíram em cada balde. Esboços se
+juntam somando contagens, o que qualquer groupby já faz: com o balde na
+chave do cubo (ver cubo.py) ou como coluna dos pacientes, os quantis de
+qualquer recorte (convênio, exame, sexo, mês...) saem de um agrupamento
+por recorte × balde, sem ordenar nem reler as linhas. Diferente do
+t-digest e do KLL, o erro não depende da ordem de chegada nem de quantos
+esboços foram juntados.
+"""
+import numpy as np
+import pandas as pd
+
+ERRO = 0.005
+GAMA = (1 + ERRO) / (1 - ERRO)
+MINIMO = 0.01  # um centavo; valores menores ficam no primeiro balde
+
+# Nome -> quantil, na ordem das colunas dos resultados
+QUANTIS = {'Mínimo': 0, 'P25': 0.25, 'Mediana': 0.5, 'P75': 0.75, 'P90': 0.9,
+           'Máximo': 1}
+
+
+def baldes(valores):
+    """Balde de cada valor (Int16; nulo para valores ausentes)."""
+    valores = np.asarray(valores, dtype='float64')
+    modulo = np.maximum(np.abs(valores), MINIMO)
+    balde = np.sign(valores) * (np.ceil(np.log(modulo / MINIMO) / np.log(GAMA)) + 1)
+    return pd.array(balde, dtype='Float64').astype('Int16')
+
+
+def representante(baldes):
+    """Valor que representa cada balde (a menos de ERRO dos valores dele)."""
+    baldes = np.asarray(baldes, dtype='float64')
+    modulo = MINIMO * 2 * GAMA ** (np.abs(baldes) - 1) / (GAMA + 1)
+    return np.where(baldes == 0, 0.0, np.sign(baldes) * modulo)
+
+
+def quantis(contagens, nomes=QUANTIS):
+    """Quantis de cada grupo a partir do esboço juntado.
+
+    `contagens` é uma Series com o índice (grupo..., balde) e o número de
+    valores de cada balde. Devolve um DataFrame indexado pelos grupos, com
+    uma coluna por item de `nomes`. O quantil q de n valores é o de posição
+    floor(q·(n-1)) na ordem, como em `quantile(q, interpolation='lower')`.
+    """
+    contagens = contagens[contagens > 0].sort_index()
+    grupos = contagens.groupby(level=list(range(contagens.index.nlevels - 1)),
+                               sort=False, observed=True)
+    n = contagens.to_numpy('int64')
+    ate = grupos.cumsum().to_numpy('int64')
+    total = grupos.transform('sum').to_numpy('int64')
+    valor = representante(contagens.index.get_level_values(-1).to_numpy('float64'))
+    indice = contagens.index.droplevel(-1)
+
+    colunas = {}
+    for nome, q in nomes.items():
+        posicao = np.floor(q * (total - 1))
+        # O balde que contém a posição: o primeiro cujo acumulado a passa
+        contem = (ate > posicao) & (ate - n <= posicao)
+        colunas[nome] = pd.Series(valor[contem], index=indice[contem])
+    return pd.DataFrame(colunas)
@@ -0,0 +1,156 @@
+"""Gera os painéis como relatórios estáticos, sem o servidor do Streamlit.
+
+Pensado para rodar fora do horário de uso (cron), por exemplo:
+
+    python relatorios.py relatorios/2025-05-02 --processos 4
+
+Os dados são carregados uma vez e enviados a um pool de processos; cada
+processo calcula um painel (ver paineis.py) e grava em `saida/<painel>/`:
+
+    <item>.csv    tabelas
+    <item>.json   tabelas e figuras (JSON do Plotly)
+    painel.html   o painel completo, com as figuras interativas
+"""
+import argparse
+import html
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from plotly.graph_objects import Figure
+
+from exames import indexar_exames
+from exportacoes import multipla
+from graficos import reduzir_painel
+from ingestao import PLANILHA, cubo_atual, versao_armazem
+from pacientes import ARQUIVO, carregar_pacientes
+from paineis import (itens, painel_convenio, painel_convenios, painel_exames,
+                     painel_faixa_idade, painel_sexo, painel_temporal,
+                     painel_tipo_exame, painel_visao_geral)
+
+FORMATOS = ['html', 'json', 'csv']
+
+# nome -> (dados de entrada, função, título)
+PAINEIS = {
+    'geral_tipo_exame': ('cubo', painel_tipo_exame, 'Análise por tipo de exame'),
+    'geral_temporal': ('cubo', painel_temporal, 'Análise temporal'),
+    'geral_convenio': ('cubo', painel_convenio, 'Análise por Convênio'),
+    'visao_geral': ('pacientes', painel_visao_geral, 'Visão geral'),
+    'exames': ('exames', painel_exames, 'Exames'),
+    'convenios': ('pacientes', painel_convenios, 'Convênios'),
+    'sexo': ('pacientes', painel_sexo, 'Análise por sexo'),
+    'faixa_idade': ('pacientes', painel_faixa_idade, 'Análise por faixa de idade'),
+}
+
+# Dados do processo (preenchidos por _iniciar em cada processo do pool)
+_dados = {}
+
+
+def _iniciar(dados):
+    _dados.update(dados)
+
+
+def _avisar(mensagem):
+    print(mensagem, file=sys.stderr)
+
+
+def _tabela(objeto):
+    return objeto.to_frame() if isinstance(objeto, pd.Series) else objeto
+
+
+def gravar_painel(painel, pasta, titulo, formatos=FORMATOS):
+    """Grava os itens de `painel` em `pasta` e devolve os arquivos criados."""
+    os.makedirs(pasta, exist_ok=True)
+    # Sem 'html', as partes da página nem são montadas
+    com_html = 'html' in formatos
+    arquivos, partes = [], [f'<h1>{html.escape(titulo)}</h1>']
+
+    for nome, objeto in itens(painel):
+        base = os.path.join(pasta, nome)
+        if com_html:
+            partes.append(f'<h2>{html.escape(nome)}</h2>')
+        if isinstance(objeto, Figure):
+            if 'json' in formatos:
+                objeto.write_json(base + '.json')
+                arquivos.append(base + '.json')
+            if com_html:
+                partes.append(objeto.to_html(full_html=False,
+                                             include_plotlyjs='cdn'))
+            continue
+
+        tabela = _tabela(objeto)
+        if 'csv' in formatos:
+            tabela.to_csv(base + '.csv', encoding='utf-8-sig')
+            arquivos.append(base + '.csv')
+        if 'json' in formatos:
+            tabela.to_json(base + '.json', orient='split', date_format='iso',
+                           force_ascii=False)
+            arquivos.append(base + '.json')
+        if com_html:
+            partes.append(tabela.to_html(decimal=','))
+
+    if com_html:
+        caminho = os.path.join(pasta, 'painel.html')
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write('<html><head><meta charset="utf-8"><title>'
+                          f'{html.escape(titulo)}</title></head><body>\n')
+            arquivo.write('\n'.join(partes))
+            arquivo.write('\n</body></html>\n')
+        arquivos.append(caminho)
+    return arquivos
+
+
+def _gerar(nome, saida, formatos):
+    entrada, funcao, titulo = PAINEIS[nome]
+    if entrada == 'exames':
+        painel = funcao(_dados['pacientes'], _dados['exames'])
+    else:
+        painel = funcao(_dados[entrada])
+    return gravar_painel(reduzir_painel(painel), os.path.join(saida, nome), titulo, formatos)
+
+
+def carregar_entradas(nomes, planilha=PLANILHA, pacientes=ARQUIVO):
+    """Carrega só os dados exigidos pelos painéis `nomes`."""
+    entradas = {PAINEIS[nome][0] for nome in nomes}
+    dados = {}
+    if 'cubo' in entradas:
+        if versao_armazem() is None and not (multipla(planilha) or
+                                             os.path.exists(planilha)):
+            raise FileNotFoundError(f'{planilha} não encontrada e sem armazém')
+        dados['cubo'] = cubo_atual(planilha, avisar=_avisar)
+    if entradas & {'pacientes', 'exames'}:
+        dados['pacientes'] = carregar_pacientes(pacientes, avisar=_avisar)
+    if 'exames' in entradas:
+        dados['exames'] = indexar_exames(dados['pacientes']['Exames'])
+    return dados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Gera os painéis como arquivos HTML/JSON/CSV.')
+    parser.add_argument('saida', help='pasta de destino')
+    parser.add_argument('--paineis', nargs='+', choices=list(PAINEIS),
+                        default=list(PAINEIS), help='padrão: todos')
+    parser.add_argument('--formatos', nargs='+', choices=FORMATOS,
+                        default=FORMATOS)
+    parser.add_argument('--processos', type=int, default=None,
+                        help='tamanho do pool (padrão: nº de CPUs)')
+    parser.add_argument('--planilha', default=PLANILHA,
+                        help='linhas de exame (arquivo, pasta ou glob), se não '
+                             'houver armazém')
+    parser.add_argument('--pacientes', default=ARQUIVO,
+                        help='pacientes (arquivo, pasta ou glob)')
+    args = parser.parse_args(argv)
+
+    dados = carregar_entradas(args.paineis, args.planilha, args.pacientes)
+    with ProcessPoolExecutor(args.processos, initializer=_iniciar,
+                             initargs=(dados,)) as pool:
+        tarefas = {nome: pool.submit(_gerar, nome, args.saida, args.formatos)
+                   for nome in args.paineis}
+        for nome, tarefa in tarefas.items():
+            print(f'{nome}: {len(tarefa.result())} arquivos')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Cache colunar (Parquet) na frente das planilhas Excel dos relatórios.
+
+Cada planilha é convertida uma única vez para Parquet em PASTA_SNAPSHOTS.
+As cargas seguintes leem o Parquet, que é muito mais rápido que o openpyxl.
+O snapshot é refeito quando o tamanho, a data de modificação ou o hash
+(sha256) da planilha de origem mudam.
+
+Uso pela linha de comando, para gerar os snapshots antes de subir o painel:
+
+    python snapshot.py paciente_por_data.xlsx convenio_detalhado_linha.xlsx
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+
+import pandas as pd
+
+PASTA_SNAPSHOTS = os.environ.get('CLINICA_SNAPSHOTS', '.snapshots')
+
+
+def nome_snapshot(origem):
+    # Caminho relativo à pasta atual, sem extensão: exportações de unidades
+    # diferentes podem ter o mesmo nome de arquivo (ver exportacoes.py)
+    caminho = os.path.abspath(origem)
+    relativo = os.path.relpath(caminho)
+    if not relativo.startswith('..'):
+        caminho = relativo
+    return re.sub(r'[^\w.-]+', '_', os.path.splitext(caminho)[0]).strip('_')
+
+
+def _caminhos(origem):
+    base = os.path.join(PASTA_SNAPSHOTS, nome_snapshot(origem))
+    return base + '.parquet', base + '.json'
+
+
+def calcular_hash(caminho):
+    """Retorna o sha256 do arquivo, lido em blocos de 1 MiB."""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def assinatura(origem):
+    """Data de modificação (ns) e tamanho do arquivo, usados como versão."""
+    info = os.stat(origem)
+    return {'mtime_ns': info.st_mtime_ns, 'tamanho': info.st_size}
+
+
+def _ler_meta(caminho_meta):
+    try:
+        with open(caminho_meta, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_meta(caminho_meta, meta):
+    temporario = caminho_meta + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(meta, arquivo)
+    os.replace(temporario, caminho_meta)
+
+
+def snapshot_valido(origem):
+    """Indica se o snapshot de `origem` existe e corresponde à planilha atual.
+
+    Tamanho diferente invalida direto. Se só a data de modificação mudou, o
+    hash decide, assim um arquivo copiado ou "tocado" não força reconversão.
+    """
+    caminho_parquet, caminho_meta = _caminhos(origem)
+    meta = _ler_meta(caminho_meta)
+    if meta is None or not os.path.exists(caminho_parquet):
+        return False
+
+    atual = assinatura(origem)
+    if meta.get('tamanho') != atual['tamanho']:
+        return False
+    if meta.get('mtime_ns') == atual['mtime_ns']:
+        return True
+    if meta.get('sha256') != calcular_hash(origem):
+        return False
+
+    # Mesmo conteúdo: só atualiza a data para não recalcular o hash depois
+    meta['mtime_ns'] = atual['mtime_ns']
+    _gravar_meta(caminho_meta, meta)
+    return True
+
+
+def _tipar_colunas(df):
+    # O Parquet exige um tipo por coluna; colunas mistas viram texto
+    for coluna in df.columns[df.dtypes == object]:
+        tipos = df[coluna].dropna().map(type).unique()
+        if len(tipos) > 1:
+            df[coluna] = df[coluna].where(df[coluna].isna(),
+                                          df[coluna].astype(str))
+    return df
+
+
+def construir_snapshot(origem):
+    """Converte a planilha `origem` para Parquet e devolve o DataFrame lido."""
+    os.makedirs(PASTA_SNAPSHOTS, exist_ok=True)
+    caminho_parquet, caminho_meta = _caminhos(origem)
+
+    meta = assinatura(origem)
+    meta['sha256'] = calcular_hash(origem)
+    df = _tipar_colunas(pd.read_excel(origem))
+
+    temporario = caminho_parquet + '.tmp'
+    df.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho_parquet)
+    _gravar_meta(caminho_meta, meta)
+    return df
+
+
+def caminho_snapshot(origem):
+    """Caminho do Parquet de `origem`, gerando o snapshot se preciso."""
+    if not snapshot_valido(origem):
+        construir_snapshot(origem)
+    return _caminhos(origem)[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Gera os snapshots Parquet das planilhas dos relatórios.')
+    parser.add_argument('planilhas', nargs='+', help='arquivos .xlsx de origem')
+    parser.add_argument('--forcar', action='store_true',
+                        help='reconstrói mesmo se o snapshot estiver válido')
+    args = parser.parse_args(argv)
+
+    for origem in args.planilhas:
+        if not args.forcar and snapshot_valido(origem):
+            print(f'{origem}: snapshot em dia')
+            continue
+        df = construir_snapshot(origem)
+        print(f'{origem}: snapshot gerado ({len(df)} linhas)')
+
+
+if __name__ == '__main__':
+    main()
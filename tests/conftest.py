@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [RAIZ, os.path.join(RAIZ, 'benchmarks')]
+
+
+@pytest.fixture(scope='session')
+def planilhas(tmp_path_factory):
+    """(linhas, pacientes): planilhas sintéticas pequenas (ver dados_sinteticos.py).
+
+    Os testes rodam na pasta delas, onde ficam os snapshots e não há armazém.
+    """
+    from dados_sinteticos import gravar
+
+    pasta = tmp_path_factory.mktemp('planilhas')
+    linhas, pacientes = str(pasta / 'linhas.xlsx'), str(pasta / 'pacientes.xlsx')
+    gravar('linhas', 20000, linhas)
+    gravar('pacientes', 5000, pacientes)
+    anterior = os.getcwd()
+    os.chdir(pasta)
+    yield linhas, pacientes
+    os.chdir(anterior)
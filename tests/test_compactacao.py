@@ -0,0 +1,16 @@
+import pandas as pd
+
+from compactacao import vista
+
+
+def test_vista_nao_altera_o_compartilhado():
+    with pd.option_context('mode.copy_on_write', True):
+        compartilhado = pd.DataFrame({'Valor': [1.0, 2.0], 'Sexo': pd.Categorical(['F', 'M'])})
+        pagina = vista(compartilhado)
+        pagina.loc[0, 'Valor'] = 9.0
+        pagina['Valor'] *= 2
+        pagina['Nova'] = 1
+        pd.testing.assert_frame_equal(
+            compartilhado,
+            pd.DataFrame({'Valor': [1.0, 2.0], 'Sexo': pd.Categorical(['F', 'M'])}))
+        assert list(pagina['Valor']) == [18.0, 4.0]
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingestao import numerar_bloco, numerar_ocorrencias
+
+
+def _linhas():
+    gerador = np.random.default_rng(3)
+    n = 400
+    return pd.DataFrame({
+        'Data': pd.to_datetime('2025-04-01') + pd.to_timedelta(
+            np.sort(gerador.integers(0, 6, n)), unit='D'),
+        'Convênio': gerador.choice(['SUS', 'PART'], n),
+        'Descrição': gerador.choice(['GLI', 'TGO'], n),
+        'Valor': gerador.choice([10.0, 12.5], n),
+    })
+
+
+def test_blocos_numeram_como_o_arquivo_inteiro():
+    linhas = _linhas()
+    vistas, partes = None, []
+    for inicio in range(0, len(linhas), 37):
+        ocorrencias, vistas = numerar_bloco(linhas.iloc[inicio:inicio + 37], vistas)
+        partes.append(ocorrencias)
+    pd.testing.assert_series_equal(pd.concat(partes), numerar_ocorrencias(linhas))
+    # Só o último dia continua aberto
+    assert set(vistas['Data']) == {linhas['Data'].max()}
+
+
+def test_bloco_com_dia_fechado():
+    linhas = _linhas()
+    _, vistas = numerar_bloco(linhas.iloc[200:], None)
+    with pytest.raises(ValueError, match='ordem de data'):
+        numerar_bloco(linhas.iloc[:200], vistas)
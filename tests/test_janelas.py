@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cubo import montar_cubo
+from janelas import fatiar, indexar_datas, por_dimensao, resumo
+
+
+@pytest.fixture(scope='module')
+def indice():
+    gerador = np.random.default_rng(5)
+    n = 3000
+    linhas = pd.DataFrame({
+        'Data': pd.to_datetime('2025-01-01') + pd.to_timedelta(
+            gerador.integers(0, 90, n), unit='D'),
+        'Convênio': gerador.choice(['SUS', 'PART', 'IPES', None], n),
+        'Descrição': gerador.choice([f'EXAME {i}' for i in range(60)] + [None], n),
+        'Valor': gerador.integers(100, 9000, n) / 100,
+    })
+    return indexar_datas(montar_cubo(linhas))
+
+
+@pytest.mark.parametrize('dimensao', ['Convênio', 'Descrição'])
+@pytest.mark.parametrize('inicio, fim', [('2025-01-01', '2025-01-01'),
+                                         ('2025-02-03', '2025-02-09'),
+                                         ('2024-12-01', '2025-06-01'),
+                                         ('2025-05-01', '2025-05-31')])
+def test_janela_igual_ao_agrupamento(indice, dimensao, inicio, fim):
+    periodo = fatiar(indice, inicio, fim)
+    esperado = periodo.groupby(dimensao)[['Quantidade', 'Valor']].sum()
+    tabela = por_dimensao(indice, dimensao, inicio, fim)
+    assert list(tabela.index) == list(esperado.index)
+    assert list(tabela['Quantidade']) == list(esperado['Quantidade'])
+    np.testing.assert_allclose(tabela['Valor'], esperado['Valor'])
+    assert resumo(indice, inicio, fim)['quantidade'] == periodo['Quantidade'].sum()
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agregacoes import contagem, cruzar, media, soma
+
+duckdb = pytest.importorskip('duckdb')
+from motor_duckdb import FonteDuckDB  # noqa: E402
+
+
+@pytest.fixture
+def tabela():
+    gerador = np.random.default_rng(7)
+    n = 500
+    return pd.DataFrame({
+        'Convênio': gerador.choice(['SUS', 'UNIMED', "D'OR"], n),
+        'Descrição': gerador.choice(['GLICOSE', 'TGO', 'TGP', 'UREIA'], n),
+        'Sexo': pd.Categorical(gerador.choice(['F', 'M'], n)),
+        'Quantidade': gerador.integers(1, 5, n),
+        'Valor': gerador.integers(500, 20000, n) / 100,
+    })
+
+
+@pytest.fixture
+def fonte(tabela):
+    conexao = duckdb.connect()
+    conexao.register('tabela_pandas', tabela)
+    conexao.execute('CREATE TABLE tabela AS SELECT * FROM tabela_pandas')
+    return FonteDuckDB(conexao, 'tabela', categoricas=['Sexo'])
+
+
+def test_agregacoes_iguais_as_do_pandas(tabela, fonte):
+    pd.testing.assert_series_equal(soma(fonte, 'Convênio', 'Quantidade'),
+                                   soma(tabela, 'Convênio', 'Quantidade'))
+    pd.testing.assert_series_equal(media(fonte, ['Convênio', 'Sexo'], 'Valor'),
+                                   media(tabela, ['Convênio', 'Sexo'], 'Valor'))
+    pd.testing.assert_series_equal(contagem(fonte, 'Sexo', normalizar=True),
+                                   contagem(tabela, 'Sexo', normalizar=True))
+    pd.testing.assert_frame_equal(cruzar(fonte, 'Convênio', 'Descrição'),
+                                  cruzar(tabela, 'Convênio', 'Descrição'))
+
+
+def test_filtrar(tabela, fonte):
+    filtrada = fonte.filtrar(convenio="D'OR", exames=['TGO', 'UREIA'])
+    esperado = tabela[(tabela['Convênio'] == "D'OR")
+                      & tabela['Descrição'].isin(['TGO', 'UREIA'])]
+    assert len(filtrada) == len(esperado)
+    assert list(filtrada.distintos('Descrição')) == ['TGO', 'UREIA']
+    pd.testing.assert_series_equal(soma(filtrada, 'Descrição', 'Valor'),
+                                   soma(esperado, 'Descrição', 'Valor'))
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from agregacoes import contagem
+from cubo import montar_cubo
+from paineis import painel_tipo_exame
+from paridade import paridade
+
+
+@pytest.mark.parametrize('motor', ['duckdb', 'polars'])
+def test_paineis_iguais_aos_do_pandas(planilhas, motor):
+    pytest.importorskip(motor)
+    assert paridade([motor], *planilhas) == []
+
+
+def test_ticket_empatado_desempata_pelo_nome():
+    linhas = pd.DataFrame({
+        'Data': pd.to_datetime(['2025-01-02'] * 2),
+        'Convênio': ['SUS', 'SUS'],
+        'Descrição': ['EXAME B', 'EXAME A'],
+        'Valor': [7.41, 7.41],
+    })
+    cubo = montar_cubo(linhas)
+    # Mesma média a menos de um ULP, como entre somas de motores diferentes
+    cubo.loc[cubo['Descrição'] == 'EXAME B', 'Valor'] = 7.410000000000001
+
+    ticket = painel_tipo_exame(cubo)['ticket_exame']
+    assert list(ticket.index) == ['EXAME A', 'EXAME B']
+
+
+def test_contagem_empatada_segue_as_categorias():
+    faixas = pd.Series(pd.Categorical(['18-25', '0-17', '46-60', '18-25', '0-17'],
+                                      categories=['0-17', '18-25', '46-60']))
+    serie = contagem(pd.DataFrame({'Faixa_etária': faixas}), 'Faixa_etária')
+    assert list(serie.index) == ['0-17', '18-25', '46-60']
+    assert list(serie) == [2, 2, 1]
+
+
+@pytest.mark.parametrize('motor', ['duckdb', 'polars'])
+def test_painel_recente_pelo_cubo_diario(planilhas, motor):
+    pytest.importorskip(motor)
+    from agregacoes import modulo_motor
+    from cubo import cubo_diario
+    from ingestao import cubo_atual
+    from janelas import data_referencia, indexar_datas, janela
+    from paineis import painel_recente
+    from paineis import itens
+    from paridade import diferenca
+
+    pandas = indexar_datas(cubo_atual(planilhas[0]))
+    motor = indexar_datas(cubo_diario(modulo_motor(motor).fonte_cubo(planilhas[0])))
+    assert data_referencia(motor) == data_referencia(pandas)
+    inicio, fim = janela(pandas, 30)
+    for convenio in [None, 'SUS']:
+        referencia = dict(itens(painel_recente(pandas, inicio, fim, convenio)))
+        resultado = dict(itens(painel_recente(motor, inicio, fim, convenio)))
+        for item, objeto in referencia.items():
+            if isinstance(objeto, (pd.Series, pd.DataFrame)):
+                assert diferenca(objeto, resultado[item]) is None, item
+            elif item != 'faixas':
+                assert resultado[item] == pytest.approx(objeto), item
@@ -0,0 +1,116 @@
+"""Rankings (top K) por fatia, com contagens que se somam incrementalmente.
+
+As medidas de cada item (exame) em cada fatia (convênio, sexo, faixa
+etária...) ficam em matrizes fatias × itens, com os itens em ordem
+alfabética. Linhas novas viram outra `Contagens` que é somada às
+existentes com `juntar`, sem recontar o histórico; o ranking de uma fatia
+seleciona os K maiores com `np.partition`, em tempo proporcional ao número
+de itens, e não ao de linhas.
+
+As contagens são exatas: o número de exames distintos é pequeno, então não
+há ganho em aproximá-las (Space-Saving e afins) e perder a exatidão.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+class Contagens(NamedTuple):
+    fatias: pd.Index  # valores da fatia (NaN conta como uma fatia)
+    itens: pd.Index   # itens, em ordem alfabética
+    medidas: dict     # medida -> matriz (fatias, itens)
+
+
+def contar(itens, fatias=None, **medidas):
+    """Soma `medidas` (arrays alinhados às linhas) por fatia × item.
+
+    Sem `fatias`, todas as linhas ficam em uma fatia só. Linhas sem item são
+    ignoradas. Medidas inteiras continuam inteiras.
+    """
+    codigo_item, valores_item = pd.factorize(np.asarray(itens, dtype=object), sort=True)
+    if fatias is None:
+        codigo_fatia, valores_fatia = np.zeros(len(codigo_item), dtype='int64'), [None]
+    else:
+        codigo_fatia, valores_fatia = pd.factorize(
+            np.asarray(fatias, dtype=object), sort=True, use_na_sentinel=False)
+
+    valido = codigo_item >= 0
+    n_fatias, n_itens = len(valores_fatia), len(valores_item)
+    chave = codigo_fatia[valido] * n_itens + codigo_item[valido]
+    matrizes = {}
+    for nome, valores in medidas.items():
+        valores = np.asarray(valores)
+        soma = np.bincount(chave, weights=valores[valido], minlength=n_fatias * n_itens)
+        if valores.dtype.kind in 'iub':
+            soma = np.rint(soma).astype('int64')
+        matrizes[nome] = soma.reshape(n_fatias, n_itens)
+    return Contagens(pd.Index(valores_fatia, dtype=object),
+                     pd.Index(valores_item, dtype=object), matrizes)
+
+
+def _expandir(contagens, fatias, itens):
+    linhas = fatias.get_indexer(contagens.fatias)
+    colunas = itens.get_indexer(contagens.itens)
+    matrizes = {}
+    for nome, matriz in contagens.medidas.items():
+        nova = np.zeros((len(fatias), len(itens)), dtype=matriz.dtype)
+        nova[np.ix_(linhas, colunas)] = matriz
+        matrizes[nome] = nova
+    return matrizes
+
+
+def juntar(a, b):
+    """Soma duas Contagens com as mesmas medidas (fatias e itens se unem)."""
+    fatias = a.fatias.union(b.fatias, sort=False)
+    itens = a.itens.union(b.itens).sort_values()
+    matrizes_a, matrizes_b = _expandir(a, fatias, itens), _expandir(b, fatias, itens)
+    return Contagens(fatias, itens,
+                     {nome: matrizes_a[nome] + matrizes_b[nome] for nome in a.medidas})
+
+
+def maiores(valores, k=None):
+    """Posições dos `k` maiores `valores`, do maior ao menor.
+
+    Empates ficam na ordem das posições, como num sort estável. Com `k`,
+    só os candidatos a partir do K-ésimo maior valor são ordenados.
+    """
+    valores = np.asarray(valores)
+    candidatos = np.arange(len(valores))
+    if k is not None and k < len(valores):
+        limite = np.partition(valores, len(valores) - k)[len(valores) - k]
+        candidatos = np.flatnonzero(valores >= limite)
+    ordem = np.argsort(-valores[candidatos], kind='stable')
+    return candidatos[ordem][:k]
+
+
+def top(contagens, medida, k=None, fatia=None, nome=None):
+    """Series com os `k` itens de maior `medida` na `fatia` (None: todas).
+
+    Itens com a medida zerada na fatia não entram. O índice se chama 'Exame'
+    ou `nome`, e a Series, `medida`.
+    """
+    matriz = contagens.medidas[medida]
+    if fatia is None:
+        valores = matriz.sum(axis=0)
+    else:
+        posicao = contagens.fatias.get_indexer([fatia])[0]
+        valores = matriz[posicao] if posicao >= 0 else np.zeros(len(contagens.itens),
+                                                                dtype=matriz.dtype)
+    presentes = np.flatnonzero(valores != 0)
+    posicoes = presentes[maiores(valores[presentes], k)]
+    return pd.Series(valores[posicoes],
+                     index=pd.Index(contagens.itens[posicoes], name=nome or 'Exame'),
+                     name=medida)
+
+
+def tabela(contagens, fatia, item):
+    """Contagens em formato longo (uma linha por fatia × item com medida)."""
+    n_fatias, n_itens = len(contagens.fatias), len(contagens.itens)
+    df = pd.DataFrame({
+        fatia: np.repeat(contagens.fatias.to_numpy(), n_itens),
+        item: np.tile(contagens.itens.to_numpy(), n_fatias),
+        **{nome: matriz.ravel() for nome, matriz in contagens.medidas.items()},
+    })
+    preenchida = np.any([matriz.ravel() != 0 for matriz in contagens.medidas.values()], axis=0)
+    return df[preenchida].reset_index(drop=True)